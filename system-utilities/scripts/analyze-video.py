@@ -11,8 +11,147 @@ import json
 import argparse
 from pathlib import Path
 import subprocess
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from functools import lru_cache, partial
 
-def transcribe_with_whisper(video_path, model_size="base"):
+class WhisperEngine:
+    """openai-whisper on torch (the original backend)."""
+
+    name = 'whisper'
+    label = 'Whisper'
+
+    def load(self, model_size, threads=0):
+        import whisper
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return whisper.load_model(model_size)
+
+    def transcribe(self, model, audio):
+        return model.transcribe(audio)
+
+class FasterWhisperEngine:
+    """
+    faster-whisper: the same Whisper weights on CTranslate2 with int8 quantization.
+
+    Typically several times faster than torch on CPU with a fraction of the memory.
+    Results are converted to openai-whisper's segment schema so everything
+    downstream is engine-agnostic.
+    """
+
+    name = 'faster-whisper'
+    label = 'faster-whisper int8'
+
+    def load(self, model_size, threads=0):
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(model_size, device='cpu', compute_type='int8', cpu_threads=threads)
+
+    def transcribe(self, model, audio):
+        segments, info = model.transcribe(audio, beam_size=5)
+        segments = [
+            {
+                'id': i,
+                'seek': seg.seek,
+                'start': seg.start,
+                'end': seg.end,
+                'text': seg.text,
+                'tokens': list(seg.tokens),
+                'temperature': seg.temperature,
+                'avg_logprob': seg.avg_logprob,
+                'compression_ratio': seg.compression_ratio,
+                'no_speech_prob': seg.no_speech_prob,
+            }
+            for i, seg in enumerate(segments)
+        ]
+        return {
+            'text': ''.join(seg['text'] for seg in segments),
+            'language': info.language,
+            'segments': segments,
+        }
+
+ENGINES = {engine.name: engine for engine in (WhisperEngine(), FasterWhisperEngine())}
+
+class WhisperModelManager:
+    """
+    Keeps loaded Whisper models resident so a batch loads each size once.
+
+    Models are held in a small LRU keyed by (engine, size): asking for one that
+    isn't loaded evicts the least recently used once `max_models` are resident.
+    Load and inference time are accumulated separately so the batch summary shows
+    where time went. `threads` (0 = library default) caps each engine's CPU threads.
+    """
+
+    def __init__(self, max_models=1):
+        self.max_models = max(1, max_models)
+        self.models = OrderedDict()
+        self.lock = threading.Lock()
+        self.load_seconds = 0.0
+        self.inference_seconds = 0.0
+        self.loads = 0
+        self.threads = 0
+        self.chunk_pool_key = None
+        self.chunk_pool = None
+
+    def get(self, model_size, engine='whisper'):
+        """Return the `engine` model for `model_size`, loading it on first use."""
+        key = (engine, model_size)
+        with self.lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                return self.models[key]
+
+            while len(self.models) >= self.max_models:
+                (evicted_engine, evicted), _ = self.models.popitem(last=False)
+                print(f"  Unloading {ENGINES[evicted_engine].label} {evicted} model")
+            start = time.perf_counter()
+            model = ENGINES[engine].load(model_size, self.threads)
+            elapsed = time.perf_counter() - start
+            self.load_seconds += elapsed
+            self.loads += 1
+            self.models[key] = model
+            print(f"  Loaded {ENGINES[engine].label} {model_size} model in {elapsed:.1f}s")
+            return model
+
+    def transcribe(self, model_size, audio, engine='whisper'):
+        """Run inference with a resident model, timing it apart from loading."""
+        model = self.get(model_size, engine)
+        start = time.perf_counter()
+        result = ENGINES[engine].transcribe(model, audio)
+        self.inference_seconds += time.perf_counter() - start
+        return result
+
+    def pool(self, model_size, workers, engine='whisper'):
+        """
+        Process pool for chunked transcription, kept warm across videos.
+
+        Each worker loads `model_size` into its own MODELS on first use. Only one
+        pool is resident; asking for another engine, size or worker count replaces it.
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        with self.lock:
+            if self.chunk_pool_key != (engine, model_size, workers):
+                if self.chunk_pool is not None:
+                    self.chunk_pool.shutdown()
+                self.chunk_pool = ProcessPoolExecutor(max_workers=workers,
+                                                      mp_context=multiprocessing.get_context('spawn'))
+                self.chunk_pool_key = (engine, model_size, workers)
+            return self.chunk_pool
+
+    def summary(self):
+        return (f"Whisper: {self.loads} model load(s) {self.load_seconds:.1f}s, "
+                f"inference {self.inference_seconds:.1f}s")
+
+# Shared by every video in this process
+MODELS = WhisperModelManager()
+
+def transcribe_with_whisper(video_path, model_size="base", models=None, engine='whisper'):
     """
     Transcribe video audio using Whisper.
 
@@ -21,21 +160,175 @@ def transcribe_with_whisper(video_path, model_size="base"):
         model_size: Whisper model (tiny, base, small, medium, large)
                    base = good quality, fast (74MB)
                    small = better quality, slower (244MB)
+        models: WhisperModelManager to load from (default: the process-wide MODELS)
+        engine: Key of ENGINES to run the model on
 
     Returns:
         dict with segments containing timestamps and text
     """
-    import whisper
+    models = models or MODELS
+
+    print(f"\n[1/3] Transcribing audio with {ENGINES[engine].label} ({model_size} model)...")
+
+    start = time.perf_counter()
+    result = models.transcribe(model_size, str(video_path), engine)
+
+    print(f"✓ Transcribed {len(result['segments'])} segments in {time.perf_counter() - start:.1f}s")
+
+    return result
+
+SAMPLE_RATE = 16000
+
+def load_audio(video_path):
+    """Decode the audio track to 16 kHz mono float32, as whisper.load_audio() does."""
+    import numpy as np
+
+    result = subprocess.run(
+        ['ffmpeg', '-nostdin', '-v', 'error', '-i', str(video_path), '-map', '0:a:0?',
+         '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', 'pipe:1'],
+        capture_output=True, check=True
+    )
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+# Energy VAD: 30 ms frames; speech is anything this many dB above the noise floor
+VAD_FRAME_SECONDS = 0.03
+VAD_MARGIN_DB = 12.0
+VAD_MIN_SILENCE = 0.6
+VAD_PAD = 0.2
+
+def speech_regions(audio, sr=SAMPLE_RATE):
+    """
+    Find speech in `audio` with a cheap energy detector.
+
+    The noise floor is the 10th percentile of per-frame RMS (raw footage is
+    mostly room tone). Frames VAD_MARGIN_DB above it, or louder than -35 dBFS, count
+    as speech. Gaps shorter than VAD_MIN_SILENCE are bridged and regions padded by
+    VAD_PAD so word edges aren't clipped.
+
+    Returns:
+        list of (start, end) in seconds
+    """
+    import numpy as np
+
+    hop = int(sr * VAD_FRAME_SECONDS)
+    n = len(audio) // hop
+    if n == 0:
+        return []
+    frames = audio[:n * hop].reshape(n, hop)
+    db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+    floor = np.percentile(db, 10)
+    voiced = db > min(floor + VAD_MARGIN_DB, -35.0)
+
+    regions = []
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        start_s, end_s = start * VAD_FRAME_SECONDS, end * VAD_FRAME_SECONDS
+        if regions and start_s - regions[-1][1] < VAD_MIN_SILENCE:
+            regions[-1][1] = end_s
+        else:
+            regions.append([start_s, end_s])
+    duration = len(audio) / sr
+    return [(max(0.0, float(lo) - VAD_PAD), min(duration, float(hi) + VAD_PAD)) for lo, hi in regions]
+
+def plan_chunks(regions, max_seconds=120.0, max_gap=5.0):
+    """
+    Group speech regions into chunks of at most `max_seconds`, splitting only in silence.
 
-    print(f"\n[1/3] Transcribing audio with Whisper ({model_size} model)...")
+    Regions are merged only across pauses shorter than `max_gap`, so long dead air
+    between takes is never sent to Whisper. A single region longer than `max_seconds` (a long monologue) is cut into
+    equal pieces; Whisper's own 30 s windowing makes those seams harmless.
+    """
+    chunks = []
+    for lo, hi in regions:
+        if chunks and lo - chunks[-1][1] < max_gap and hi - chunks[-1][0] <= max_seconds:
+            chunks[-1][1] = hi
+            continue
+        pieces = max(1, int(-(-(hi - lo) // max_seconds)))
+        step = (hi - lo) / pieces
+        chunks += [[lo + i * step, lo + (i + 1) * step] for i in range(pieces)]
+    return [tuple(c) for c in chunks]
+
+def _transcribe_chunk(model_size, audio, offset, threads, engine='whisper'):
+    """Worker side of transcribe_chunked(): segments shifted to absolute time."""
+    MODELS.threads = threads
+    result = MODELS.transcribe(model_size, audio, engine)
+    segments = []
+    for seg in result['segments']:
+        seg = dict(seg, start=seg['start'] + offset, end=seg['end'] + offset)
+        if 'seek' in seg:
+            seg['seek'] += int(offset * 100)
+        if seg.get('words'):
+            seg['words'] = [dict(w, start=w['start'] + offset, end=w['end'] + offset) for w in seg['words']]
+        segments.append(seg)
+    return segments, result.get('language')
+
+def transcribe_chunked(video_path, model_size="base", workers=None, audio=None, engine='whisper'):
+    """
+    Transcribe only the speech in a video, in parallel chunks.
 
-    model = whisper.load_model(model_size)
-    result = model.transcribe(str(video_path))
+    An energy VAD finds speech, which is grouped into chunks split at silences.
+    The chunks are transcribed in a warm process pool (MODELS.pool()) and their
+    segments stitched back with absolute timestamps, so the result has the same
+    shape as transcribe_with_whisper(). Wall time follows speech duration divided
+    by workers rather than file length.
 
-    print(f"✓ Transcribed {len(result['segments'])} segments")
+    Args:
+        audio: Already-decoded 16 kHz float32 audio (skips decoding, e.g. from decode_once())
 
+    Returns:
+        dict with text, language and segments
+    """
+    workers = workers or min(4, os.cpu_count() or 1)
+    print(f"\n[1/3] Transcribing speech in parallel chunks ({ENGINES[engine].label} {model_size} model, "
+          f"{workers} workers)...")
+    start = time.perf_counter()
+
+    if audio is None:
+        audio = load_audio(video_path)
+    duration = len(audio) / SAMPLE_RATE
+    chunks = plan_chunks(speech_regions(audio))
+    speech = sum(hi - lo for lo, hi in chunks)
+    print(f"  {speech:.0f}s of speech in {len(chunks)} chunk(s), skipping {duration - speech:.0f}s of silence")
+
+    pool = MODELS.pool(model_size, workers, engine)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    futures = [
+        pool.submit(_transcribe_chunk, model_size,
+                    audio[int(lo * SAMPLE_RATE):int(hi * SAMPLE_RATE)], lo, threads, engine)
+        for lo, hi in chunks
+    ]
+
+    segments = []
+    languages = defaultdict(float)
+    for (lo, hi), future in zip(chunks, futures):
+        chunk_segments, language = future.result()
+        segments.extend(chunk_segments)
+        if language:
+            languages[language] += hi - lo
+    for i, seg in enumerate(segments):
+        seg['id'] = i
+
+    result = {
+        'text': ''.join(seg['text'] for seg in segments),
+        'language': max(languages, key=languages.get) if languages else None,
+        'segments': segments,
+    }
+    print(f"✓ Transcribed {len(segments)} segments in {time.perf_counter() - start:.1f}s "
+          f"({duration:.0f}s of audio)")
     return result
 
+def chunk_workers(args):
+    """Process count for chunked transcription, or 0 when it is off."""
+    if not args.chunked_transcription:
+        return 0
+    return args.transcribe_workers or min(4, os.cpu_count() or 1)
+
+def transcribe(video_path, args):
+    """Transcript for `video_path` using the mode chosen in `args`."""
+    if args.chunked_transcription:
+        return transcribe_chunked(video_path, args.whisper_model, chunk_workers(args), engine=args.engine)
+    return transcribe_with_whisper(video_path, args.whisper_model, engine=args.engine)
+
 def detect_scenes(video_path, threshold=27.0):
     """
     Detect scene changes using PySceneDetect.
@@ -73,51 +366,694 @@ def detect_scenes(video_path, threshold=27.0):
 
     return scenes
 
-def analyze_with_gemini(video_path, transcript, scenes, script_content=None):
+def probe_video(video_path):
     """
-    Upload video to Gemini for visual analysis.
+    Read stream metadata with ffprobe (header only, no decoding).
+
+    Returns:
+        dict with width, height, fps, duration (seconds) and has_audio
+    """
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_streams', '-show_format', str(video_path)],
+        capture_output=True, text=True, check=True
+    )
+    info = json.loads(result.stdout)
+    video = next((st for st in info['streams'] if st.get('codec_type') == 'video'), None)
+    if video is None:
+        raise ValueError(f"No video stream in {video_path}")
+    num, _, den = video.get('avg_frame_rate', '0/1').partition('/')
+    fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+    if not fps:
+        num, _, den = video.get('r_frame_rate', '25/1').partition('/')
+        fps = float(num) / float(den or 1)
+    return {
+        'width': int(video['width']),
+        'height': int(video['height']),
+        'fps': fps,
+        'duration': float(info.get('format', {}).get('duration') or video.get('duration') or 0.0),
+        'has_audio': any(st.get('codec_type') == 'audio' for st in info['streams']),
+    }
+
+def scenes_from_cuts(cuts, total_frames, fps):
+    """
+    Turn cut frame numbers into the `scenes` list detect_scenes() returns.
+
+    Matches SceneManager.get_scene_list(): no cuts means no scenes.
+    """
+    cuts = sorted(set(c for c in cuts if 0 < c < total_frames))
+    if not cuts:
+        return []
+    bounds = [0] + cuts + [total_frames]
+    return [
+        {
+            'scene_number': i + 1,
+            'start': start / fps,
+            'end': end / fps,
+            'duration': (end - start) / fps
+        }
+        for i, (start, end) in enumerate(zip(bounds, bounds[1:]))
+    ]
+
+def scaled_size(info, frame_width):
+    """Frame size after downscaling to `frame_width` (even height, never upscaled)."""
+    width, height = info['width'], info['height']
+    if frame_width and width > frame_width:
+        height = max(2, round(height * frame_width / width / 2) * 2)
+        width = frame_width
+    return width, height
+
+def read_frames(stream, width, height):
+    """
+    Yield BGR frames from a rawvideo byte stream.
+
+    The same buffer is reused for every frame, so consumers must not keep
+    references past the next iteration (ContentDetector only keeps derived data).
+    """
+    import numpy as np
+
+    frame_size = width * height * 3
+    buf = bytearray(frame_size)
+    view = memoryview(buf)
+    frame = np.frombuffer(buf, dtype=np.uint8).reshape(height, width, 3)
+    while True:
+        filled = 0
+        while filled < frame_size:
+            n = stream.readinto(view[filled:])
+            if not n:
+                return
+            filled += n
+        yield frame
+
+# Frames handed to ContentDetector in single-decode mode are scaled to this width,
+# about what SceneManager's auto-downscale uses for HD input
+DEFAULT_FRAME_WIDTH = 256
+
+def decode_once(video_path, model_size="base", threshold=27.0, frame_width=DEFAULT_FRAME_WIDTH, models=None,
+                chunk_workers=0, engine='whisper'):
+    """
+    Transcribe and detect scenes from a single ffmpeg decode of the video.
+
+    One ffmpeg process writes 16 kHz mono PCM to one pipe and downscaled BGR frames
+    to another. Frames go straight into ContentDetector.process_frame() as they
+    arrive, and PCM collects in memory for Whisper. No temp files are used and the
+    source is read once, where the two-pass mode reads it twice (Whisper's ffmpeg
+    plus PySceneDetect's own decoder).
+
+    With chunk_workers > 0 the PCM goes to transcribe_chunked() instead.
+
+    Returns:
+        (transcript, scenes) in the same formats as transcribe_with_whisper()
+        and detect_scenes()
+    """
+    import numpy as np
+    from scenedetect.detectors import ContentDetector
+
+    models = models or MODELS
+    print(f"\n[1-2/3] Decoding once for transcription ({model_size} model) and scene detection...")
+
+    info = probe_video(video_path)
+    width, height = scaled_size(info, frame_width)
+
+    frame_read, frame_write = os.pipe()
+    # -vsync rather than -fps_mode, which needs ffmpeg >= 5.1
+    cmd = ['ffmpeg', '-nostdin', '-v', 'error', '-i', str(video_path),
+           '-map', '0:v:0', '-vf', f"scale={width}:{height}", '-vsync', 'passthrough',
+           '-pix_fmt', 'bgr24', '-f', 'rawvideo', f"pipe:{frame_write}"]
+    if info['has_audio']:
+        cmd += ['-map', '0:a:0', '-ac', '1', '-ar', '16000', '-f', 's16le', 'pipe:1']
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=(frame_write,))
+    os.close(frame_write)
+
+    # Drain audio and stderr on threads so neither pipe can stall ffmpeg
+    pcm = bytearray()
+    errors = []
+
+    def drain_audio():
+        while chunk := proc.stdout.read(1 << 16):
+            pcm.extend(chunk)
+
+    readers = [threading.Thread(target=drain_audio, daemon=True),
+               threading.Thread(target=lambda: errors.append(proc.stderr.read()), daemon=True)]
+    for reader in readers:
+        reader.start()
+
+    detector = ContentDetector(threshold=threshold)
+    cuts = []
+    frame_num = 0
+    with os.fdopen(frame_read, 'rb', buffering=0) as frames:
+        for frame in read_frames(frames, width, height):
+            cuts.extend(detector.process_frame(frame_num, frame) or [])
+            frame_num += 1
+    proc.wait()
+    for reader in readers:
+        reader.join()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on {video_path}: {b''.join(errors).decode(errors='replace').strip()}")
+    cuts.extend(detector.post_process(frame_num) or [])
+    decode_seconds = time.perf_counter() - start
+
+    scenes = scenes_from_cuts(cuts, frame_num, info['fps'])
+    print(f"✓ Decoded {frame_num} frames at {width}x{height} in {decode_seconds:.1f}s, "
+          f"detected {len(scenes)} scene changes")
+
+    audio = np.frombuffer(bytes(pcm), dtype=np.int16).astype(np.float32) / 32768.0
+    if audio.size and chunk_workers:
+        transcript = transcribe_chunked(video_path, model_size, chunk_workers, audio=audio, engine=engine)
+    elif audio.size:
+        start = time.perf_counter()
+        transcript = models.transcribe(model_size, audio, engine)
+        print(f"✓ Transcribed {len(transcript['segments'])} segments in {time.perf_counter() - start:.1f}s")
+    else:
+        transcript = {'text': '', 'language': None, 'segments': []}
+        print("✓ No audio stream, skipped transcription")
+
+    return transcript, scenes
+
+# Seconds decoded before each chunk so ContentDetector is warmed up (previous
+# frame, min_scene_len) by the time it reaches the frames the chunk owns
+CHUNK_OVERLAP_SECONDS = 2.0
+
+def _detect_chunk(video_path, owned_start, owned_end, fps, width, height, threshold, frame_skip):
+    """
+    Scene cuts in [owned_start, owned_end) seconds, as absolute frame numbers.
+
+    Runs in a worker process. Decoding starts CHUNK_OVERLAP_SECONDS early; cuts
+    found in that lead-in belong to the previous chunk and are dropped.
+    """
+    from scenedetect.detectors import ContentDetector
+
+    decode_start = max(0.0, owned_start - CHUNK_OVERLAP_SECONDS)
+    step = frame_skip + 1
+    vf = f"scale={width}:{height}"
+    if step > 1:
+        vf = f"select=not(mod(n\\,{step})),{vf}"
+    cmd = ['ffmpeg', '-nostdin', '-v', 'error', '-ss', f"{decode_start:.3f}", '-i', str(video_path),
+           '-t', f"{owned_end - decode_start:.3f}", '-map', '0:v:0', '-vf', vf,
+           '-vsync', 'passthrough', '-pix_fmt', 'bgr24', '-f', 'rawvideo', 'pipe:1']
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    detector = ContentDetector(threshold=threshold)
+    first = round(decode_start * fps)
+    cuts = []
+    index = 0
+    for index, frame in enumerate(read_frames(proc.stdout, width, height)):
+        # Real frame numbers keep min_scene_len in source frames despite skipping
+        cuts.extend(detector.process_frame(first + index * step, frame) or [])
+    cuts.extend(detector.post_process(first + (index + 1) * step) or [])
+    proc.stdout.close()
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed on {video_path} at {decode_start:.1f}s")
+    lo, hi = round(owned_start * fps), round(owned_end * fps)
+    return [c for c in cuts if lo <= c < hi]
+
+def detect_scenes_fast(video_path, threshold=27.0, workers=None, frame_width=DEFAULT_FRAME_WIDTH,
+                       frame_skip=0, chunk_seconds=60.0, pool=None, min_scene_len=15):
+    """
+    Approximate detect_scenes() by scanning time chunks in parallel processes.
+
+    Each chunk is decoded separately (seeking with ffmpeg -ss), downscaled to
+    `frame_width` and optionally thinned to every (frame_skip + 1)th frame, with
+    CHUNK_OVERLAP_SECONDS of lead-in so cuts right at a boundary are still found.
+    Merged cuts closer than `min_scene_len` frames are collapsed, as ContentDetector
+    would within one pass. Videos that fit in one chunk (or that ffprobe reports no
+    duration for) go through detect_scenes() instead.
 
     Args:
-        video_path: Path to video file
-        transcript: Whisper transcription result
-        scenes: PySceneDetect scene list
-        script_content: Optional script text to match against
+        pool: Executor to run chunks on (default: a new pool of `workers` processes)
 
     Returns:
-        Gemini's analysis and edit suggestions
+        list of scenes in the detect_scenes() format
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    start = time.perf_counter()
+    info = probe_video(video_path)
+    fps, duration = info['fps'], info['duration']
+    bounds = [i * chunk_seconds for i in range(int(duration // chunk_seconds) + 1)] + [duration]
+    chunks = [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+    if len(chunks) < 2:
+        # Nothing to parallelize, or no usable duration from ffprobe: one exact pass.
+        return detect_scenes(video_path, threshold)
+
+    print(f"\n[2/3] Detecting scene changes (fast: {frame_width or 'full'} px, skip {frame_skip})...")
+    width, height = scaled_size(info, frame_width)
+
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 2, len(chunks)),
+                                   mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futures = [pool.submit(_detect_chunk, video_path, lo, hi, fps, width, height, threshold, frame_skip)
+                   for lo, hi in chunks]
+        found = sorted(c for future in futures for c in future.result())
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    cuts = []
+    for cut in found:
+        if not cuts or cut - cuts[-1] >= min_scene_len:
+            cuts.append(cut)
+    scenes = scenes_from_cuts(cuts, round(duration * fps), fps)
+    print(f"✓ Detected {len(scenes)} scene changes in {len(chunks)} chunk(s), "
+          f"{time.perf_counter() - start:.1f}s")
+    return scenes
+
+# A fast-mode cut within this many seconds of an exact-mode cut counts as a match
+SCENE_MATCH_TOLERANCE = 0.5
+
+def compare_cuts(reference, candidate, tolerance=SCENE_MATCH_TOLERANCE):
+    """Precision and recall of candidate scene starts against reference ones."""
+    ref = [sc['start'] for sc in reference[1:]]
+    cand = [sc['start'] for sc in candidate[1:]]
+    unmatched = list(ref)
+    hits = 0
+    for t in cand:
+        best = min(unmatched, key=lambda r: abs(r - t), default=None)
+        if best is not None and abs(best - t) <= tolerance:
+            unmatched.remove(best)
+            hits += 1
+    precision = hits / len(cand) if cand else 1.0
+    recall = hits / len(ref) if ref else 1.0
+    return precision, recall
+
+def bench_scenes(args):
+    """
+    Accuracy vs speed report: exact detect_scenes() against fast-mode settings.
+
+    Fast mode is scored by precision/recall of its cuts within SCENE_MATCH_TOLERANCE
+    seconds of the exact cuts.
+    """
+    configs = [(args.frame_width, 0), (args.frame_width, 1), (args.frame_width, 3)]
+    if args.frame_skip not in (0, 1, 3):
+        configs.append((args.frame_width, args.frame_skip))
+    configs += [(args.frame_width * 2, 0), (0, 0)]
+    print(f"{'video':<26} {'mode':<20} {'wall s':>8} {'speedup':>8} {'cuts':>5} {'prec':>6} {'recall':>7}")
+    for video_file in args.videos:
+        video_path = Path(video_file)
+        start = time.perf_counter()
+        exact = detect_scenes(video_path, args.scene_threshold)
+        exact_wall = time.perf_counter() - start
+        rows = [('exact', exact_wall, exact, 1.0, 1.0)]
+        for width, skip in configs:
+            start = time.perf_counter()
+            fast = detect_scenes_fast(video_path, args.scene_threshold, args.scene_workers,
+                                      width, skip, args.chunk_seconds)
+            rows.append((f"fast {width or 'full'}px skip {skip}", time.perf_counter() - start, fast,
+                         *compare_cuts(exact, fast)))
+        print()
+        for mode, wall, scenes, precision, recall in rows:
+            print(f"{video_path.name[:26]:<26} {mode:<20} {wall:>8.2f} {exact_wall / wall:>7.1f}x "
+                  f"{max(len(scenes) - 1, 0):>5} {precision:>6.2f} {recall:>7.2f}")
+    return 0
+
+class GeminiFilesAPI:
+    """The slice of google.generativeai that the remote stage uses."""
+
+    label = "Gemini 2.0 Flash"
+    kind = 'gemini'
+
+    def __init__(self):
+        import google.generativeai as genai
+
+        api_key = os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            print("ERROR: GEMINI_API_KEY environment variable not set")
+            print("Get your API key from: https://aistudio.google.com/apikey")
+            sys.exit(1)
+        genai.configure(api_key=api_key)
+        self.genai = genai
+
+    def upload_file(self, path):
+        return self.genai.upload_file(str(path))
+
+    def get_file(self, name):
+        return self.genai.get_file(name)
+
+    def generate(self, parts):
+        """parts: uploaded files, prompt strings and inline {'mime_type', 'data'} images."""
+        model = self.genai.GenerativeModel('gemini-2.0-flash')
+        return model.generate_content(parts).text
+
+class StubFilesAPI:
+    """
+    Offline stand-in for GeminiFilesAPI.
+
+    Uploads take `bytes_per_second` to "transfer" and stay PROCESSING for
+    `processing_seconds`. File records live as small JSON files under `root`, so
+    the upload registry can be exercised across runs. generate() returns a canned
+    summary. Nothing leaves the machine.
     """
-    import google.generativeai as genai
 
-    print(f"\n[3/3] Analyzing video content with Gemini 2.0 Flash...")
+    label = "offline stub"
+    kind = 'stub'
+
+    def __init__(self, root=None, processing_seconds=1.0, bytes_per_second=50e6, lifetime_hours=48):
+        self.root = Path(root) if root else default_cache_path().parent / 'stub-files'
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.processing_seconds = processing_seconds
+        self.bytes_per_second = bytes_per_second
+        self.lifetime = lifetime_hours * 3600
+
+    def _file(self, record):
+        from datetime import datetime, timezone
+        from types import SimpleNamespace
+
+        ready = time.time() >= record['ready_at']
+        return SimpleNamespace(
+            name=record['name'],
+            state=SimpleNamespace(name='ACTIVE' if ready else 'PROCESSING'),
+            expiration_time=datetime.fromtimestamp(record['expires_at'], timezone.utc),
+        )
+
+    def upload_file(self, path):
+        import uuid
+
+        size = os.path.getsize(path)
+        time.sleep(size / self.bytes_per_second)
+        now = time.time()
+        record = {'name': f"files/{uuid.uuid4().hex[:12]}", 'size': size,
+                  'ready_at': now + self.processing_seconds, 'expires_at': now + self.lifetime}
+        (self.root / f"{record['name'].split('/')[1]}.json").write_text(json.dumps(record))
+        return self._file(record)
+
+    def get_file(self, name):
+        path = self.root / f"{name.split('/')[-1]}.json"
+        if not path.exists():
+            raise LookupError(f"File {name} not found")
+        record = json.loads(path.read_text())
+        if record['expires_at'] <= time.time():
+            path.unlink()
+            raise LookupError(f"File {name} expired")
+        return self._file(record)
+
+    def generate(self, parts):
+        files = [p.name for p in parts if hasattr(p, 'name')]
+        images = [p for p in parts if isinstance(p, dict)]
+        chars = sum(len(p) for p in parts if isinstance(p, str))
+        return (f"Stub analysis of {', '.join(files) or 'no video'}: {len(images)} image(s), "
+                f"{chars} chars of prompt.")
+
+def wait_until_active(api, remote_file, initial=1.0, factor=2.0, max_delay=30.0, timeout=1800, what='video'):
+    """
+    Poll get_file() with exponential backoff until the upload leaves PROCESSING.
 
-    # Configure Gemini
-    api_key = os.getenv('GEMINI_API_KEY')
-    if not api_key:
-        print("ERROR: GEMINI_API_KEY environment variable not set")
-        print("Get your API key from: https://aistudio.google.com/apikey")
-        sys.exit(1)
+    Short clips are usually ready within a second or two, so checks start quickly;
+    long ones back off to one check every `max_delay` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial
+    while remote_file.state.name == "PROCESSING":
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"{remote_file.name} still processing after {timeout}s")
+        print(f"  Processing {what} (next check in {delay:.0f}s)...", end='\r')
+        time.sleep(delay)
+        delay = min(delay * factor, max_delay)
+        remote_file = api.get_file(remote_file.name)
+
+    if remote_file.state.name == "FAILED":
+        raise ValueError(f"{what.capitalize()} processing failed")
+    return remote_file
+
+# Seconds of validity an uploaded file must have left to be reused
+UPLOAD_REUSE_MARGIN = 3600
+
+class RemoteUploads:
+    """
+    Gets each video onto the files API at most once.
 
-    genai.configure(api_key=api_key)
+    - prepare() starts transcoding a low-resolution, low-fps analysis proxy in the
+      background, so it is ready by the time transcription and scene detection finish.
+    - A JSON registry maps content hash to remote file name and expiry. A still-valid
+      upload is reused (after a get_file() check) instead of sending the video again.
+    - Uploads are polled with wait_until_active()'s exponential backoff.
 
-    # Upload video
-    print(f"Uploading video to Gemini...")
-    video_file = genai.upload_file(str(video_path))
-    print(f"✓ Uploaded: {video_file.name}")
+    With proxy=False the original file is uploaded; with registry_path=None nothing
+    is remembered between runs. With max_bytes, close() trims the proxy and
+    keyframe directories back to that size each, least recently used first.
+    """
 
-    # Wait for processing
-    import time
-    while video_file.state.name == "PROCESSING":
-        print("  Processing video...", end='\r')
-        time.sleep(2)
-        video_file = genai.get_file(video_file.name)
+    def __init__(self, registry_path=None, proxy=True, proxy_dir=None, max_bytes=None, keyframe_dir=None):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.registry_path = Path(registry_path) if registry_path else None
+        self.proxy = proxy
+        self.proxy_dir = Path(proxy_dir) if proxy_dir else default_cache_path().parent / 'proxies'
+        self.keyframe_dir = Path(keyframe_dir) if keyframe_dir else default_cache_path().parent / 'keyframes'
+        self.max_bytes = max_bytes
+        self.pruned_bytes = 0
+        self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='proxy')
+        self.proxies = {}
+        self.lock = threading.Lock()
+        self.registry = {}
+        if self.registry_path and self.registry_path.exists():
+            try:
+                self.registry = json.loads(self.registry_path.read_text())
+            except (OSError, ValueError) as exc:
+                print(f"Warning: ignoring unreadable upload registry {self.registry_path}: {exc}")
+        self.uploaded_bytes = 0
+        self.reused = 0
+        # Per video: proxy_s, upload_s, processing_s and uploaded_bytes, for --metrics-out
+        self.per_video = defaultdict(lambda: defaultdict(float))
+
+    def record(self, video_path, **amounts):
+        with self.lock:
+            stats = self.per_video[str(video_path)]
+            for name, amount in amounts.items():
+                stats[name] += amount
+            self.uploaded_bytes += amounts.get('uploaded_bytes', 0)
+
+    def prepare(self, video_path):
+        """Start making the proxy for `video_path` in the background (no-op without proxies)."""
+        if not self.proxy:
+            return
+        with self.lock:
+            if video_path not in self.proxies:
+                self.proxies[video_path] = self.pool.submit(self._make_proxy, video_path)
+
+    def _make_proxy(self, video_path):
+        start = time.perf_counter()
+        proxy_path = make_proxy(video_path, self.proxy_dir)
+        self.record(video_path, proxy_s=time.perf_counter() - start)
+        return proxy_path
+
+    def _upload_source(self, video_path):
+        if not self.proxy:
+            return Path(video_path)
+        self.prepare(video_path)
+        return self.proxies[video_path].result()
+
+    def file_for(self, api, video_path):
+        """An ACTIVE remote file for `video_path`, reusing a registered upload if valid."""
+        key = f"{api.kind}:{content_hash(video_path)}:{'proxy' if self.proxy else 'original'}"
+        entry = self.registry.get(key)
+        if entry and entry['expires_at'] - time.time() > UPLOAD_REUSE_MARGIN:
+            try:
+                remote_file = api.get_file(entry['name'])
+            except Exception:
+                remote_file = None
+            if remote_file is not None and remote_file.state.name != "FAILED":
+                print(f"✓ Reusing upload {entry['name']}")
+                self.reused += 1
+                return wait_until_active(api, remote_file)
+
+        source = self._upload_source(video_path)
+        size = os.path.getsize(source)
+        print(f"Uploading {'proxy' if self.proxy else 'video'} ({size / 1e6:.1f} MB) to {api.label}...")
+        start = time.perf_counter()
+        remote_file = api.upload_file(source)
+        uploaded = time.perf_counter()
+        print(f"✓ Uploaded: {remote_file.name}")
+        remote_file = wait_until_active(api, remote_file)
+        self.record(video_path, uploaded_bytes=size, upload_s=uploaded - start,
+                    processing_s=time.perf_counter() - uploaded)
+
+        expires = getattr(remote_file, 'expiration_time', None)
+        with self.lock:
+            self.registry[key] = {
+                'name': remote_file.name,
+                'expires_at': expires.timestamp() if expires else time.time() + 47 * 3600,
+                'bytes': size,
+            }
+            self.registry = {k: v for k, v in self.registry.items() if v['expires_at'] > time.time()}
+            if self.registry_path:
+                self.registry_path.parent.mkdir(parents=True, exist_ok=True)
+                with atomic_open(self.registry_path) as f:
+                    json.dump(self.registry, f, indent=2)
+        return remote_file
+
+    def summary(self):
+        summary = f"Uploads: {self.uploaded_bytes / 1e6:.1f} MB sent, {self.reused} reused"
+        if self.pruned_bytes:
+            summary += f"; {self.pruned_bytes / 1e6:.1f} MB of old proxies/keyframes removed"
+        return summary
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        if self.max_bytes is not None:
+            for directory in (self.proxy_dir, self.keyframe_dir):
+                self.pruned_bytes += prune_lru(directory, self.max_bytes)
+
+def prune_lru(directory, max_bytes):
+    """
+    Delete the least recently used entries of `directory` until it holds at most `max_bytes`.
 
-    if video_file.state.name == "FAILED":
-        raise ValueError("Video processing failed")
+    Entries are files (proxies) or subdirectories (one video's keyframes); their
+    mtime is refreshed on every reuse. Hidden, in-progress outputs are left alone.
 
-    print("✓ Video ready for analysis")
+    Returns:
+        bytes freed
+    """
+    import shutil
+
+    directory = Path(directory)
+    if not directory.is_dir():
+        return 0
+    entries = []
+    for entry in directory.iterdir():
+        if entry.name.startswith('.'):
+            continue
+        try:
+            files = list(entry.iterdir()) if entry.is_dir() else [entry]
+            entries.append((entry.stat().st_mtime, sum(f.stat().st_size for f in files), entry))
+        except OSError:
+            continue
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, entry in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            if entry.is_dir():
+                shutil.rmtree(entry)
+            else:
+                entry.unlink()
+        except OSError:
+            continue
+        total -= size
+        freed += size
+    return freed
+
+def make_proxy(video_path, proxy_dir, height=360, fps=2):
+    """
+    Transcode a small analysis proxy (360p, 2 fps, low-bitrate mono audio).
+
+    Gemini samples video at about 1 fps, so this keeps what the model actually
+    sees at a small fraction of a camera original's size. Proxies are named by
+    content hash and reused across runs.
+    """
+    proxy_dir = Path(proxy_dir)
+    proxy_dir.mkdir(parents=True, exist_ok=True)
+    proxy_path = proxy_dir / f"{content_hash(video_path)}-{height}p{fps}.mp4"
+    if proxy_path.exists():
+        os.utime(proxy_path)  # most recently used, for prune_lru()
+        return proxy_path
+    start = time.perf_counter()
+    tmp = proxy_path.with_name(f".{proxy_path.name}.{os.getpid()}.{threading.get_ident()}.mp4")
+    subprocess.run(
+        ['ffmpeg', '-nostdin', '-v', 'error', '-y', '-i', str(video_path),
+         '-vf', f"scale=-2:'min({height},ih)',fps={fps}", '-c:v', 'libx264', '-preset', 'veryfast',
+         '-crf', '32', '-c:a', 'aac', '-ac', '1', '-b:a', '32k', '-movflags', '+faststart', str(tmp)],
+        check=True, capture_output=True
+    )
+    os.replace(tmp, proxy_path)
+    print(f"✓ Proxy ready: {os.path.getsize(video_path) / 1e6:.1f} MB -> "
+          f"{os.path.getsize(proxy_path) / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s")
+    return proxy_path
+
+# Keyframes are scaled to this width: one Gemini image tile, plenty to tell shots apart
+KEYFRAME_WIDTH = 768
+# Inline images per request. Gemini rejects requests over ~20 MB and inline data is
+# base64 (4/3 larger), so past this the remaining stills go through the files API.
+INLINE_IMAGE_BYTES = 12 << 20
+
+def keyframe_times(scenes, per_scene, duration):
+    """
+    (scene_number, timestamp) pairs spread evenly inside each scene.
+
+    A video with no detected cuts is treated as one scene of `duration` seconds.
+    """
+    spans = [(sc['scene_number'], sc['start'], sc['end']) for sc in scenes] or [(1, 0.0, duration)]
+    return [
+        (number, start + (end - start) * (i + 0.5) / per_scene)
+        for number, start, end in spans
+        for i in range(per_scene)
+    ]
+
+def _extract_frame(video_path, timestamp, out_path, width=KEYFRAME_WIDTH):
+    """Seek straight to `timestamp` (input -ss) and write one JPEG."""
+    if not out_path.exists():
+        tmp = out_path.with_name(f".{out_path.name}")
+        subprocess.run(
+            ['ffmpeg', '-nostdin', '-v', 'error', '-y', '-ss', f"{timestamp:.3f}", '-i', str(video_path),
+             '-frames:v', '1', '-vf', f"scale='min({width},iw)':-2", '-q:v', '4', '-f', 'image2', str(tmp)],
+            check=True, capture_output=True
+        )
+        os.replace(tmp, out_path)
+    return out_path
+
+def extract_keyframes(video_path, scenes, per_scene=1, workers=None, cache_dir=None):
+    """
+    Extract `per_scene` representative JPEGs for every scene, in parallel.
+
+    Each frame is its own ffmpeg process seeking directly to the timestamp, so the
+    cost is a few GOPs per frame rather than a full decode. Frames are kept under
+    the video's content hash and reused on the next run.
+
+    Returns:
+        list of (scene_number, timestamp, jpeg path)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache_dir = Path(cache_dir) if cache_dir else default_cache_path().parent / 'keyframes'
+    out_dir = cache_dir / content_hash(video_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    os.utime(out_dir)  # most recently used, for prune_lru()
+    duration = probe_video(video_path)['duration'] if not scenes else 0.0
+    times = keyframe_times(scenes, per_scene, duration)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4) as pool:
+        paths = list(pool.map(
+            lambda item: _extract_frame(video_path, item[1], out_dir / f"{item[1]:010.3f}.jpg"), times))
+    print(f"✓ Extracted {len(paths)} keyframe(s) for {len(set(n for n, _ in times))} scene(s) "
+          f"in {time.perf_counter() - start:.1f}s")
+    return [(number, t, path) for (number, t), path in zip(times, paths)]
+
+def upload_stills(api, paths, workers=8):
+    """Upload images to the files API in parallel; returns the remote files once usable."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda path: wait_until_active(api, api.upload_file(path), what='keyframe'), paths))
+
+def build_prompt(video_path, transcript, scenes, script_content=None, complete=False):
+    """
+    The analysis prompt.
+
+    complete=True (keyframe mode) includes the whole transcript and every scene,
+    since the model sees stills rather than the video.
+    """
+    if complete:
+        segments = "\n".join(f"[{seg['start']:.1f}s - {seg['end']:.1f}s] {seg['text'].strip()}"
+                              for seg in transcript['segments'])
+        scene_lines = "\n".join(f"Scene {sc['scene_number']}: {sc['start']:.1f}s - {sc['end']:.1f}s"
+                                 for sc in scenes)
+        prompt = f"""Analyze this video from one or more keyframes per scene (attached after this text,
+each labelled with its scene number and timestamp) and provide a detailed breakdown of its visual content.
+
+TRANSCRIPT (from Whisper, complete):
+{segments}
+
+DETECTED SCENES (all {len(scenes)}):
+{scene_lines}
+
+VIDEO FILE: {Path(video_path).name}
 
-    # Build analysis prompt
-    prompt = f"""Analyze this video and provide a detailed breakdown of its visual content.
+"""
+    else:
+        prompt = f"""Analyze this video and provide a detailed breakdown of its visual content.
 
 TRANSCRIPT (from Whisper):
 {json.dumps(transcript['segments'][:5], indent=2)}... (showing first 5 segments)
@@ -125,7 +1061,7 @@ TRANSCRIPT (from Whisper):
 DETECTED SCENES:
 {json.dumps(scenes[:10], indent=2)}... (showing first 10 scenes)
 
-VIDEO FILE: {video_path.name}
+VIDEO FILE: {Path(video_path).name}
 
 """
 
@@ -148,18 +1084,125 @@ Please provide:
 3. What text overlays or graphics would work well
 4. Suggestions for how to use this footage effectively
 """
+    return prompt
+
+def analyze_with_gemini(video_path, transcript, scenes, script_content=None, uploads=None, api=None,
+                        keyframes=0):
+    """
+    Upload video to Gemini for visual analysis.
+
+    Args:
+        video_path: Path to video file
+        transcript: Whisper transcription result
+        scenes: PySceneDetect scene list
+        script_content: Optional script text to match against
+        uploads: RemoteUploads to upload through (default: original file, no registry)
+        api: Files API to use (default: GeminiFilesAPI)
+        keyframes: If > 0, send this many stills per scene plus the full transcript
+                   and scene list instead of uploading the video
 
-    # Analyze with Gemini 2.0 Flash
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    response = model.generate_content([video_file, prompt])
+    Returns:
+        Gemini's analysis and edit suggestions
+    """
+    api = api or GeminiFilesAPI()
+    print(f"\n[3/3] Analyzing video content with {api.label}...")
+
+    if keyframes:
+        frames = extract_keyframes(Path(video_path), scenes, keyframes)
+        images = []
+        inline = uploaded = 0
+        overflow = []
+        for number, timestamp, path in frames:
+            size = path.stat().st_size
+            if not overflow and inline + size <= INLINE_IMAGE_BYTES:
+                images.append({'mime_type': 'image/jpeg', 'data': path.read_bytes()})
+                inline += size
+            else:
+                images.append(None)
+                overflow.append(path)
+                uploaded += size
+        if overflow:
+            print(f"Uploading {len(overflow)} keyframe(s) ({uploaded / 1e6:.2f} MB) over the inline limit...")
+            remote = iter(upload_stills(api, overflow))
+            images = [image or next(remote) for image in images]
+        parts = [build_prompt(video_path, transcript, scenes, script_content, complete=True)]
+        for (number, timestamp, _), image in zip(frames, images):
+            parts += [f"Scene {number} at {timestamp:.1f}s:", image]
+        if uploads is not None:
+            uploads.record(video_path, uploaded_bytes=inline + uploaded)
+        print(f"Sending {len(frames)} keyframe(s) ({(inline + uploaded) / 1e6:.2f} MB, "
+              f"{len(overflow)} via the files API) to {api.label}...")
+        analysis = api.generate(parts)
+        print(f"✓ Analysis complete")
+        return {
+            'video_file': None,
+            'keyframes': [{'scene_number': n, 'time': t} for n, t, _ in frames],
+            'analysis': analysis
+        }
+
+    own_uploads = uploads is None
+    if own_uploads:
+        uploads = RemoteUploads(proxy=False)
+    try:
+        video_file = uploads.file_for(api, Path(video_path))
+    finally:
+        if own_uploads:
+            uploads.close()
+
+    print("✓ Video ready for analysis")
+
+    prompt = build_prompt(video_path, transcript, scenes, script_content)
+    analysis = api.generate([video_file, prompt])
 
     print(f"✓ Analysis complete")
 
     return {
         'video_file': video_file.name,
-        'analysis': response.text
+        'analysis': analysis
     }
 
+def analyze_with_stub(video_path, transcript, scenes, script_content=None, uploads=None, keyframes=0):
+    """
+    analyze_with_gemini() against StubFilesAPI: same upload, registry and polling
+    path, no API key or network.
+    """
+    return analyze_with_gemini(video_path, transcript, scenes, script_content, uploads,
+                               api=StubFilesAPI(), keyframes=keyframes)
+
+REMOTE_STAGES = {
+    'gemini': analyze_with_gemini,
+    'stub': analyze_with_stub,
+}
+
+def remote_stage_for(args):
+    """The remote stage callable for `args`, with keyframe mode bound in."""
+    remote = REMOTE_STAGES[args.remote_stage]
+    if args.keyframes:
+        return partial(remote, keyframes=args.keyframes)
+    return remote
+
+@contextmanager
+def atomic_open(path):
+    """
+    Open `path` for writing via a temp file in the same directory.
+
+    The file only replaces `path` once the block finishes, so a crash or Ctrl-C
+    never leaves a truncated result behind.
+    """
+    import tempfile
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
 def save_results(output_path, transcript, scenes, gemini_analysis):
     """Save all analysis results to a JSON file."""
 
@@ -181,14 +1224,14 @@ def save_results(output_path, transcript, scenes, gemini_analysis):
         'gemini_analysis': gemini_analysis
     }
 
-    with open(output_path, 'w') as f:
+    with atomic_open(output_path) as f:
         json.dump(results, f, indent=2)
 
     print(f"\n✓ Results saved to: {output_path}")
 
     # Also save human-readable version
     txt_path = output_path.with_suffix('.txt')
-    with open(txt_path, 'w') as f:
+    with atomic_open(txt_path) as f:
         f.write("=" * 80 + "\n")
         f.write("VIDEO ANALYSIS RESULTS\n")
         f.write("=" * 80 + "\n\n")
@@ -210,7 +1253,823 @@ def save_results(output_path, transcript, scenes, gemini_analysis):
 
     print(f"✓ Human-readable version: {txt_path}")
 
-def main():
+def default_cache_path():
+    cache_home = Path(os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache')
+    return cache_home / 'analyze-video' / 'stages.sqlite'
+
+# Bytes sampled from the start, middle and end of a video for its content hash
+HASH_SAMPLE_BYTES = 1 << 20
+
+def content_hash(video_path):
+    """
+    Fast content hash: file size plus 1 MiB samples from the start, middle and end.
+
+    Cheap enough for multi-GB originals and independent of path and mtime, so a
+    moved or re-copied file still hits the cache. An edit that keeps the size and
+    only touches unsampled bytes would go unnoticed; camera footage doesn't do that.
+    """
+    st = os.stat(video_path)
+    return _content_hash(str(Path(video_path).resolve()), st.st_size, st.st_mtime_ns)
+
+@lru_cache(maxsize=1024)
+def _content_hash(video_path, size, mtime_ns):
+    import hashlib
+
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(video_path, 'rb') as f:
+        for offset in (0, max(0, size // 2 - HASH_SAMPLE_BYTES // 2), max(0, size - HASH_SAMPLE_BYTES)):
+            f.seek(offset)
+            digest.update(f.read(HASH_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+CACHE_STAGES = ('transcript', 'scenes', 'analysis')
+
+class StageCache:
+    """
+    Content-addressed cache of per-stage results in one SQLite file.
+
+    Each stage is keyed by the video's content_hash() plus only the parameters that
+    affect that stage, so changing --scene-threshold reruns scene detection (and the
+    analysis that depends on it) but reuses the transcript. Entries are evicted least
+    recently used first once the cache exceeds `max_bytes`.
+
+    A cache built with path=None is disabled: get() misses and put() does nothing.
+    Stages listed in `refresh` always miss but still store their new result.
+    """
+
+    def __init__(self, path, max_bytes=2 << 30, refresh=()):
+        self.max_bytes = max_bytes
+        self.refresh = set(refresh)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = None
+        if path is None:
+            return
+        import sqlite3
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, stage TEXT, value TEXT, size INTEGER, last_used REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_used)")
+
+    def keys_for(self, video_path, args, script_content=None):
+        """Cache key per stage for `video_path` under the options in `args`."""
+        if self.conn is None:
+            return {}
+        import hashlib
+
+        def key(stage, params):
+            blob = json.dumps([stage, video_hash, params], sort_keys=True)
+            return hashlib.blake2b(blob.encode(), digest_size=16).hexdigest()
+
+        video_hash = content_hash(video_path)
+        transcript = {'model': args.whisper_model, 'engine': args.engine, 'chunked': args.chunked_transcription}
+        scenes = {'threshold': args.scene_threshold}
+        if args.single_decode:
+            scenes.update(mode='single', frame_width=args.frame_width)
+        elif args.fast_scenes:
+            scenes.update(mode='fast', frame_width=args.frame_width, frame_skip=args.frame_skip,
+                          chunk_seconds=args.chunk_seconds)
+        analysis = {
+            'remote': args.remote_stage,
+            'proxy': not args.no_proxy,
+            'keyframes': args.keyframes,
+            'transcript': transcript,
+            'scenes': scenes,
+            'script': hashlib.sha256((script_content or '').encode()).hexdigest(),
+        }
+        return {
+            'transcript': key('transcript', transcript),
+            'scenes': key('scenes', scenes),
+            'analysis': key('analysis', analysis),
+        }
+
+    def contains(self, stage, keys):
+        """Whether get() would hit, without touching stats or recency."""
+        if self.conn is None or stage in self.refresh:
+            return False
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM entries WHERE key = ?", (keys[stage],)).fetchone() is not None
+
+    def get(self, stage, keys):
+        if self.conn is None:
+            return None
+        if stage in self.refresh:
+            self.misses += 1
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (keys[stage],)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), keys[stage]))
+            self.conn.commit()
+        self.hits += 1
+        print(f"✓ {stage.capitalize()} loaded from cache")
+        return json.loads(row[0])
+
+    def put(self, stage, keys, value):
+        if self.conn is None:
+            return
+        blob = json.dumps(value, default=float)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, stage, value, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (keys[stage], stage, blob, len(blob), time.time()),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def summary(self):
+        if self.conn is None and not (self.hits or self.misses):
+            return "Stage cache: disabled"
+        return f"Stage cache: {self.hits} hit(s), {self.misses} miss(es)"
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class BatchManifest:
+    """
+    Checkpoint of a batch run: per-video, per-stage status in a JSON file.
+
+    Rewritten atomically after every change, so an OOM kill or Ctrl-C at video 37
+    leaves an accurate record. With --resume, videos already completed with the
+    same options are skipped, and the stage cache serves any stages a failed
+    video had already finished.
+    """
+
+    def __init__(self, path, signature, resume=False):
+        self.path = Path(path)
+        self.signature = signature
+        self.resume = resume
+        self.videos = {}
+        if self.path.exists():
+            try:
+                self.videos = json.loads(self.path.read_text()).get('videos', {})
+            except (OSError, ValueError) as exc:
+                print(f"Warning: ignoring unreadable manifest {self.path}: {exc}")
+        self.completed, self.skipped, self.failed = [], [], []
+
+    def should_skip(self, video_path, output_path):
+        entry = self.videos.get(str(Path(video_path).resolve()))
+        if not (self.resume and entry and entry['status'] == 'completed'):
+            return False
+        if entry.get('signature') != self.signature or not Path(output_path).exists():
+            return False
+        self.skipped.append(Path(video_path))
+        print(f"↷ Skipping {Path(video_path).name} (completed in an earlier run)")
+        return True
+
+    def _entry(self, video_path):
+        return self.videos.setdefault(str(Path(video_path).resolve()), {'stages': {}})
+
+    def start(self, video_path, output_path):
+        entry = self._entry(video_path)
+        entry.update(status='running', output=str(output_path), signature=self.signature,
+                     stages={}, error=None)
+        self.save()
+
+    def stage_done(self, video_path, *stages):
+        entry = self._entry(video_path)
+        for stage in stages:
+            entry['stages'][stage] = 'done'
+        self.save()
+
+    def complete(self, video_path):
+        entry = self._entry(video_path)
+        entry.update(status='completed', updated=time.time())
+        self.completed.append(Path(video_path))
+        self.save()
+
+    def fail(self, video_path, stage, error, status='failed'):
+        entry = self._entry(video_path)
+        entry['stages'][stage] = status
+        entry.update(status=status, error=f"{stage}: {error}", updated=time.time())
+        self.failed.append((Path(video_path), entry['error']))
+        self.save()
+
+    def save(self):
+        with atomic_open(self.path) as f:
+            json.dump({'version': 1, 'videos': self.videos}, f, indent=2)
+
+    def print_summary(self):
+        print(f"Batch: {len(self.completed)} completed, {len(self.skipped)} skipped, "
+              f"{len(self.failed)} failed (manifest: {self.path})")
+        for video_path, error in self.failed:
+            print(f"  ✗ {video_path.name}: {error}")
+
+def _peak_rss():
+    """This process's peak RSS in bytes since the last _reset_peak_rss()."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _reset_peak_rss():
+    """Restart the VmHWM high-water mark (Linux >= 4.0) so each stage gets its own peak."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+class StageMetrics:
+    """
+    Per-stage, per-video resource metrics written as JSON lines (--metrics-out).
+
+    Each record has wall and CPU time (this process, plus children once reaped,
+    i.e. ffmpeg), peak RSS, bytes read (/proc/self/io rchar and storage read_bytes),
+    bytes uploaded and Whisper model load time, tagged with a run id, so batches
+    can be compared across runs with any JSON tool. --profile additionally wraps one stage
+    in cProfile and dumps <video>.<stage>.prof per video.
+
+    Work in process pools (scene chunks, chunked transcription) only shows up in
+    wall time. In --pipeline mode stages overlap, so per-stage records carry
+    wall time only and the process counters appear in the per-run record.
+    """
+
+    def __init__(self, path=None, uploads=None, profile_stage=None, profile_dir='.'):
+        import uuid
+
+        self.run_id = uuid.uuid4().hex[:12]
+        self.uploads = uploads
+        self.profile_stage = profile_stage
+        self.profile_dir = Path(profile_dir)
+        self.lock = threading.Lock()
+        self.peaks = defaultdict(int)
+        self.run_peak = 0
+        self.file = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(path, 'a', buffering=1)
+
+    def _snapshot(self):
+        import resource
+
+        times = os.times()
+        snap = {
+            'wall': time.perf_counter(),
+            'cpu': times.user + times.system,
+            'cpu_children': times.children_user + times.children_system,
+            'model_load': MODELS.load_seconds,
+            'uploaded': self.uploads.uploaded_bytes if self.uploads else 0,
+            'children_peak_rss': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+        }
+        try:
+            io = read_proc_io()
+            snap.update(rchar=io['rchar'], read_bytes=io['read_bytes'])
+        except OSError:
+            snap.update(rchar=0, read_bytes=0)
+        return snap
+
+    def write(self, record):
+        if self.file is None:
+            return
+        record = dict(run=self.run_id, time=time.time(), **record)
+        with self.lock:
+            self.file.write(json.dumps(record, default=str) + '\n')
+
+    def record(self, video_path, stage, **fields):
+        """Write a record measured elsewhere (e.g. by a pipeline worker)."""
+        self.write(dict(video=str(video_path) if video_path else None, stage=stage, **fields))
+
+    @contextmanager
+    def stage(self, video_path, name):
+        """
+        Measure the block as `name` for `video_path` (None for the whole run).
+
+        Yields the record dict so the caller can add fields (e.g. cached=True).
+        """
+        record = {}
+        if self.file is None and self.profile_stage != name:
+            yield record
+            return
+        profiler = None
+        if self.profile_stage == name and video_path is not None:
+            import cProfile
+            profiler = cProfile.Profile()
+        _reset_peak_rss()
+        before = self._snapshot()
+        status = 'error'
+        try:
+            if profiler:
+                profiler.enable()
+            yield record
+            status = 'ok'
+        finally:
+            if profiler:
+                profiler.disable()
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                dump = self.profile_dir / f"{Path(video_path).stem}.{name}.prof"
+                profiler.dump_stats(str(dump))
+                print(f"  Profile of {name} written to {dump} (python -m pstats {dump})")
+            after = self._snapshot()
+            peak = _peak_rss()
+            key = str(video_path)
+            if name == 'run':
+                peak = max(peak, self.run_peak)
+            elif name == 'video':
+                peak = max(peak, self.peaks.pop(key, 0))
+            else:
+                self.peaks[key] = max(self.peaks[key], peak)
+            self.run_peak = max(self.run_peak, peak)
+            fields = dict(
+                video=str(video_path) if video_path else None,
+                stage=name,
+                status=status,
+                wall_s=round(after['wall'] - before['wall'], 4),
+                cpu_s=round(after['cpu'] - before['cpu'], 4),
+                children_cpu_s=round(after['cpu_children'] - before['cpu_children'], 4),
+                model_load_s=round(after['model_load'] - before['model_load'], 4),
+                peak_rss_bytes=peak,
+                children_peak_rss_bytes=after['children_peak_rss'],
+                rchar_bytes=after['rchar'] - before['rchar'],
+                read_bytes=after['read_bytes'] - before['read_bytes'],
+                uploaded_bytes=after['uploaded'] - before['uploaded'],
+            )
+            # Caller's fields win, e.g. the status of a video whose errors were handled inside
+            fields.update(record)
+            self.write(fields)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def run_signature(args, script_content):
+    """Options that affect a video's results; --resume only skips matching runs."""
+    import hashlib
+
+    options = {name: getattr(args, name) for name in (
+        'whisper_model', 'engine', 'chunked_transcription', 'scene_threshold', 'single_decode', 'fast_scenes',
+        'frame_width', 'frame_skip', 'chunk_seconds', 'remote_stage', 'no_proxy', 'keyframes')}
+    options['script'] = hashlib.sha256((script_content or '').encode()).hexdigest()
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()[:16]
+
+def _timed_call(fn, *fn_args):
+    """Run fn(*fn_args) and return (result, wall seconds); picklable for process pools."""
+    start = time.perf_counter()
+    result = fn(*fn_args)
+    return result, time.perf_counter() - start
+
+def run_pipeline(args, script_content, output_for, cache, manifest, uploads, metrics):
+    """
+    Pipelined batch: local stages for later videos run while earlier ones are remote.
+
+    - Scene detection runs in a process pool (--scene-workers).
+    - Transcription runs on one dedicated worker thread, so one Whisper model is resident.
+    - The remote stage (Gemini or the offline stub) runs --remote-workers at a time
+      in an asyncio stage, fed through a queue of at most --queue-size videos.
+
+    The producer submits local work only a bounded window ahead, so a slow remote
+    stage applies backpressure instead of piling up finished transcripts. Stages
+    found in `cache` skip their pool entirely, and each video's progress and
+    failures are recorded in `manifest` without stopping the batch. Stage wall
+    times go to `metrics`.
+    Batch throughput approaches the slowest stage rather than the sum of stages.
+    """
+    import asyncio
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    remote = remote_stage_for(args)
+    busy = defaultdict(float)
+    # Pipeline stage -> manifest stage(s) it produces
+    produces = {'cache': ('transcript', 'scenes'), 'decode': ('transcript', 'scenes'),
+                'transcribe': ('transcript',), 'scenes': ('scenes',)}
+
+    async def pipeline(videos):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=max(1, args.queue_size))
+        # spawn: forking a process that has torch loaded is not safe
+        scene_pool = ProcessPoolExecutor(max_workers=args.scene_workers,
+                                         mp_context=multiprocessing.get_context('spawn'))
+        transcribe_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='whisper')
+        remote_pool = ThreadPoolExecutor(max_workers=args.remote_workers, thread_name_prefix='remote')
+
+        started = {}
+
+        async def stage(video_path, name, future):
+            result, seconds = await future
+            busy[name] += seconds
+            if name != 'cache':
+                # Same stage names as sequential mode so the two can be compared
+                label = {'transcribe': 'transcript', 'remote': 'analysis'}.get(name, name)
+                metrics.record(video_path, label, wall_s=round(seconds, 4), concurrent=True)
+            return result
+
+        def finished(video_path, status):
+            metrics.record(video_path, 'video', status=status, concurrent=True,
+                           wall_s=round(time.perf_counter() - started.pop(video_path), 4),
+                           **uploads.per_video.get(str(video_path), {}))
+
+        def cached(value):
+            future = loop.create_future()
+            future.set_result((value, 0.0))
+            return future
+
+        def submit_local(video_path):
+            started[video_path] = time.perf_counter()
+            keys = cache.keys_for(video_path, args, script_content)
+            if not args.keyframes and not cache.contains('analysis', keys):
+                uploads.prepare(video_path)
+            transcript, scenes = cache.get('transcript', keys), cache.get('scenes', keys)
+            if transcript is not None and scenes is not None:
+                return video_path, keys, [('cache', cached((transcript, scenes)))]
+            if args.single_decode and transcript is None:
+                # One decode feeds both, so it runs where the Whisper model lives.
+                # A cached transcript leaves only scene detection, done below.
+                both = loop.run_in_executor(
+                    transcribe_pool, _timed_call, decode_once, video_path, args.whisper_model,
+                    args.scene_threshold, args.frame_width, None, chunk_workers(args), args.engine)
+                return video_path, keys, [('decode', both)]
+            if transcript is not None:
+                transcript = cached(transcript)
+            else:
+                transcript = loop.run_in_executor(
+                    transcribe_pool, _timed_call, transcribe, video_path, args)
+            if scenes is not None:
+                scenes = cached(scenes)
+            elif args.fast_scenes:
+                # Chunks of every video share the scene pool; only the merge runs here
+                scenes = loop.run_in_executor(
+                    None, _timed_call, detect_scenes_fast, video_path, args.scene_threshold,
+                    args.scene_workers, args.frame_width, args.frame_skip, args.chunk_seconds, scene_pool)
+            else:
+                scenes = asyncio.wrap_future(
+                    scene_pool.submit(_timed_call, detect_scenes, video_path, args.scene_threshold))
+            return video_path, keys, [('transcribe', transcript), ('scenes', scenes)]
+
+        async def forward(video_path, keys, futures):
+            results = []
+            for name, future in futures:
+                try:
+                    results.append(await stage(video_path, name, future))
+                except Exception as exc:
+                    print(f"ERROR: {video_path.name}: {name} failed: {exc}")
+                    manifest.fail(video_path, produces[name][-1], exc)
+                    finished(video_path, 'error')
+                    return
+                manifest.stage_done(video_path, *produces[name])
+            transcript, scenes = results[0] if len(results) == 1 else results
+            cache.put('transcript', keys, transcript)
+            cache.put('scenes', keys, scenes)
+            print(f"✓ {video_path.name}: transcript and scenes ready")
+            await queue.put((video_path, keys, transcript, scenes))
+
+        async def produce():
+            # Local work runs at most this many videos ahead of the remote queue
+            window = args.scene_workers + queue.maxsize
+            pending = deque()
+            for video_path in videos:
+                if manifest.should_skip(video_path, output_for(video_path)):
+                    continue
+                manifest.start(video_path, output_for(video_path))
+                pending.append(submit_local(video_path))
+                if len(pending) >= window:
+                    await forward(*pending.popleft())
+            while pending:
+                await forward(*pending.popleft())
+            for _ in range(args.remote_workers):
+                await queue.put(None)
+
+        async def consume():
+            while (item := await queue.get()) is not None:
+                video_path, keys, transcript, scenes = item
+                current = 'analysis'
+                try:
+                    analysis = cache.get('analysis', keys)
+                    if analysis is None:
+                        analysis = await stage(video_path, 'remote', loop.run_in_executor(
+                            remote_pool, _timed_call, remote, video_path, transcript, scenes, script_content, uploads))
+                        cache.put('analysis', keys, analysis)
+                    manifest.stage_done(video_path, 'analysis')
+                    current = 'save'
+                    await loop.run_in_executor(
+                        remote_pool, save_results, output_for(video_path), transcript, scenes, analysis)
+                except Exception as exc:
+                    print(f"ERROR: {video_path.name}: {current} failed: {exc}")
+                    manifest.fail(video_path, current, exc)
+                    finished(video_path, 'error')
+                    continue
+                manifest.stage_done(video_path, 'save')
+                manifest.complete(video_path)
+                finished(video_path, 'ok')
+
+        try:
+            await asyncio.gather(produce(), *(consume() for _ in range(args.remote_workers)))
+        finally:
+            scene_pool.shutdown(cancel_futures=True)
+            transcribe_pool.shutdown(cancel_futures=True)
+            remote_pool.shutdown(cancel_futures=True)
+
+    videos = [Path(v) for v in args.videos]
+    start = time.perf_counter()
+    asyncio.run(pipeline(videos))
+    print(f"\nPipeline: {len(videos)} video(s) in {time.perf_counter() - start:.1f}s "
+          "(stage busy time: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in busy.items()) + ")")
+
+def read_proc_io():
+    """
+    This process's /proc/self/io counters.
+
+    rchar counts every read() including pipes; read_bytes counts what came from
+    storage (0 for page-cache hits). Both include children once they are reaped.
+    """
+    counters = {}
+    with open('/proc/self/io') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            counters[key] = int(value)
+    return counters
+
+def bench_run(args):
+    """Child side of --bench-decode: time one decode mode and print a JSON line."""
+    video_path = Path(args.videos[0])
+    before = read_proc_io()
+    start = time.perf_counter()
+    if args.bench_run == 'single':
+        decode_once(video_path, args.whisper_model, args.scene_threshold, args.frame_width, engine=args.engine)
+    else:
+        transcribe_with_whisper(video_path, args.whisper_model, engine=args.engine)
+        detect_scenes(video_path, args.scene_threshold)
+    wall = time.perf_counter() - start
+    after = read_proc_io()
+    print(json.dumps({
+        'wall': wall,
+        'load': MODELS.load_seconds,
+        'rchar': after['rchar'] - before['rchar'],
+        'read_bytes': after['read_bytes'] - before['read_bytes'],
+    }))
+    return 0
+
+def bench_decode(args):
+    """
+    Compare two-pass decoding against decode_once() on each video.
+
+    Every mode runs in a fresh process so model caches and I/O counters don't leak
+    between runs. Drop the page cache first (echo 1 > /proc/sys/vm/drop_caches) for
+    meaningful read_bytes on files that fit in RAM.
+    """
+    print(f"{'video':<30} {'mode':<9} {'wall s':>8} {'load s':>7} {'rchar MB':>9} {'disk MB':>8}")
+    for video_file in args.videos:
+        video_path = Path(video_file)
+        size = video_path.stat().st_size
+        runs = {}
+        for mode in ('two-pass', 'single'):
+            cmd = [sys.executable, __file__, str(video_path), '--bench-run', mode,
+                   '--whisper-model', args.whisper_model, '--engine', args.engine, '--scene-threshold', str(args.scene_threshold),
+                   '--frame-width', str(args.frame_width)]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"ERROR: {video_path.name} ({mode}): {result.stderr.strip()}")
+                return 1
+            runs[mode] = json.loads(result.stdout.strip().splitlines()[-1])
+            run = runs[mode]
+            print(f"{video_path.name[:30]:<30} {mode:<9} {run['wall']:>8.2f} {run['load']:>7.2f} "
+                  f"{run['rchar'] / 1e6:>9.1f} {run['read_bytes'] / 1e6:>8.1f}")
+        two, one = runs['two-pass'], runs['single']
+        print(f"  file {size / 1e6:.1f} MB; single-decode speedup {two['wall'] / one['wall']:.2f}x wall, "
+              f"{(two['wall'] - two['load']) / max(one['wall'] - one['load'], 1e-9):.2f}x excluding model load")
+    return 0
+
+def bench_engine_run(args):
+    """Child side of --bench-engines: load one engine/model, transcribe, print a JSON line."""
+    import resource
+
+    engine, _, model_size = args.bench_engine_run.partition(':')
+    audio = load_audio(args.videos[0])
+    start = time.perf_counter()
+    MODELS.get(model_size, engine)
+    load = time.perf_counter() - start
+    load_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    result = MODELS.transcribe(model_size, audio, engine)
+    inference = time.perf_counter() - start
+    print(json.dumps({
+        'audio': len(audio) / SAMPLE_RATE,
+        'load': load,
+        'inference': inference,
+        'segments': len(result['segments']),
+        'load_rss': load_rss * 1024,
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }))
+    return 0
+
+def bench_engines(args):
+    """
+    Real-time factor and memory of every engine x model size on a reference clip.
+
+    Each combination runs in a fresh process so peak RSS is its own. RTF is
+    inference time / audio duration (lower is better; < 1 is faster than real time).
+
+    Returns:
+        0 if every combination ran, 1 if any of them failed
+    """
+    video_path = Path(args.videos[0])
+    sizes = [size.strip() for size in args.bench_models.split(',') if size.strip()]
+    print(f"Reference clip: {video_path.name}")
+    print(f"{'engine':<16} {'model':<7} {'load s':>7} {'infer s':>8} {'RTF':>6} {'load MB':>8} {'peak MB':>8}")
+    failed = 0
+    for engine in ENGINES:
+        for size in sizes:
+            cmd = [sys.executable, __file__, str(video_path), '--bench-engine-run', f"{engine}:{size}"]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                reason = (result.stderr.strip().splitlines() or ['failed'])[-1]
+                print(f"{engine:<16} {size:<7} {reason}")
+                failed += 1
+                continue
+            run = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{engine:<16} {size:<7} {run['load']:>7.1f} {run['inference']:>8.1f} "
+                  f"{run['inference'] / max(run['audio'], 1e-9):>6.3f} "
+                  f"{run['load_rss'] / 1e6:>8.0f} {run['peak_rss'] / 1e6:>8.0f}")
+    if failed:
+        print(f"\n{failed} of {len(ENGINES) * len(sizes)} runs failed")
+        return 1
+    return 0
+
+def default_socket_path():
+    """Per-user socket the daemon listens on (mirrored in bin/analyze-video)."""
+    if os.getenv('ANALYZE_VIDEO_SOCKET'):
+        return Path(os.environ['ANALYZE_VIDEO_SOCKET'])
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / 'analyze-video.sock'
+    return Path(f"/tmp/analyze-video-{os.getuid()}.sock")
+
+class _JobOutput:
+    """
+    Stand-in for sys.stdout/sys.stderr inside the daemon.
+
+    While a job runs, everything printed (from any thread) is forwarded to that
+    job's client as {"out": text} lines; between jobs output goes to the terminal.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.conn = None
+        # Worker threads print concurrently and sendall() can interleave partial writes.
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        conn = self.conn
+        if conn is None:
+            return self.fallback.write(text)
+        if text:
+            data = (json.dumps({'out': text}) + '\n').encode()
+            with self.lock:
+                conn.sendall(data)
+        return len(text)
+
+    def flush(self):
+        if self.conn is None:
+            self.fallback.flush()
+
+def serve(args):
+    """
+    Run the resident analysis daemon on a Unix socket.
+
+    Whisper (and the scene detection / Gemini libraries) are loaded once at startup,
+    so each submitted job only pays for inference. Jobs run one at a time; a client
+    that connects while another job is running waits in line.
+    """
+    import signal
+    import socket
+    import socketserver
+    import traceback
+
+    socket_path = Path(args.socket)
+    if socket_path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(socket_path))
+        except OSError:
+            socket_path.unlink()
+        else:
+            print(f"ERROR: a daemon is already listening on {socket_path}")
+            sys.exit(1)
+        finally:
+            probe.close()
+
+    MODELS.max_models = max(2, args.max_models)
+    print(f"Warming up ({ENGINES[args.engine].label} {args.whisper_model})...")
+    MODELS.get(args.whisper_model, args.engine)
+    for module in ('scenedetect', 'scenedetect.detectors', 'google.generativeai'):
+        try:
+            __import__(module)
+        except ImportError as exc:
+            print(f"  Warning: {module} unavailable ({exc})")
+
+    output = _JobOutput(sys.stdout)
+    errors = _JobOutput(sys.stderr)
+    sys.stdout, sys.stderr = output, errors
+    job_lock = threading.Lock()
+    waiting = [0]
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = json.loads(self.rfile.readline() or b'{}')
+            job_args = argparse.Namespace(**request['args'])
+            if waiting[0] or job_lock.locked():
+                self.wfile.write((json.dumps({'out': f"Queued behind {waiting[0] + 1} job(s)...\n"}) + '\n').encode())
+            waiting[0] += 1
+            with job_lock:
+                waiting[0] -= 1
+                output.conn = errors.conn = self.connection
+                status = 1
+                try:
+                    status = analyze_videos(job_args)
+                except SystemExit as exc:
+                    status = exc.code if isinstance(exc.code, int) else 1
+                except BrokenPipeError:
+                    return
+                except Exception:
+                    traceback.print_exc()
+                finally:
+                    output.conn = errors.conn = None
+            try:
+                self.wfile.write((json.dumps({'exit': status}) + '\n').encode())
+            except OSError:
+                pass
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    # Treat `kill` like Ctrl-C so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with Server(str(socket_path), Handler) as server:
+        os.chmod(socket_path, 0o600)
+        print(f"✓ analyze-video daemon listening on {socket_path} (Ctrl-C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sys.stdout, sys.stderr = output.fallback, errors.fallback
+            socket_path.unlink(missing_ok=True)
+
+def submit_to_daemon(args):
+    """
+    Send a job to the daemon and stream its output.
+
+    Returns the job's exit status, or None if no daemon is listening.
+    """
+    import socket
+
+    socket_path = Path(args.socket)
+    if not socket_path.exists():
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(str(socket_path))
+    except OSError:
+        conn.close()
+        return None
+
+    # The daemon has its own working directory, so send absolute paths
+    job = dict(vars(args))
+    job['videos'] = [str(Path(v).resolve()) for v in args.videos]
+    for key in ('output', 'output_dir', 'script', 'cache', 'manifest', 'upload_registry',
+                'metrics_out', 'profile_dir'):
+        if job[key]:
+            job[key] = str(Path(job[key]).resolve())
+
+    with conn, conn.makefile('rb') as replies:
+        conn.sendall((json.dumps({'args': job}) + '\n').encode())
+        for line in replies:
+            message = json.loads(line)
+            if 'out' in message:
+                sys.stdout.write(message['out'])
+                sys.stdout.flush()
+            elif 'exit' in message:
+                return message['exit']
+    print("ERROR: analyze-video daemon closed the connection")
+    return 1
+
+def build_parser():
     parser = argparse.ArgumentParser(
         description='Analyze video using Whisper + PySceneDetect + Gemini',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -227,10 +2086,42 @@ Examples:
 
   # Batch analyze all videos in folder
   %(prog)s videos/*.mp4 -d ./analysis/
+
+  # CPU-optimized int8 transcription, and how the engines compare
+  %(prog)s video.mp4 -o analysis.json --engine faster-whisper
+  %(prog)s reference.mp4 --bench-engines
+
+  # Long raw recordings: skip dead air, transcribe speech across cores
+  %(prog)s raw.mp4 -o analysis.json --chunked-transcription
+
+  # Decode each file once for Whisper and scene detection
+  %(prog)s video.mp4 -o analysis.json --single-decode
+
+  # Parallel, downscaled scene detection for long footage (and how accurate it is)
+  %(prog)s long.mp4 -o analysis.json --fast-scenes --frame-skip 1
+  %(prog)s long.mp4 --bench-scenes
+
+  # Send a keyframe per scene instead of uploading the video
+  %(prog)s video.mp4 -o analysis.json --keyframes 1
+
+  # Where does the time go? Per-stage metrics plus a cProfile of one stage
+  %(prog)s videos/*.mp4 -d ./analysis/ --metrics-out metrics.jsonl --profile scenes
+
+  # Pick up a batch where it died, skipping finished videos
+  %(prog)s videos/*.mp4 -d ./analysis/ --resume
+
+  # Only scene detection and the Gemini pass rerun; the transcript is cached
+  %(prog)s video.mp4 -o analysis.json --scene-threshold 20
+
+  # Overlap transcription, scene detection and Gemini across a batch
+  %(prog)s videos/*.mp4 -d ./analysis/ --pipeline
+
+  # Keep models warm in a background daemon; later runs submit jobs to it
+  %(prog)s --serve &
         '''
     )
 
-    parser.add_argument('videos', nargs='+', help='Video file(s) to analyze')
+    parser.add_argument('videos', nargs='*', help='Video file(s) to analyze')
     parser.add_argument('-o', '--output', help='Output file (for single video)')
     parser.add_argument('-d', '--output-dir', help='Output directory (for batch mode)')
     parser.add_argument('-s', '--script', help='Script file to match against')
@@ -239,8 +2130,82 @@ Examples:
                        help='Whisper model size (default: base)')
     parser.add_argument('--scene-threshold', type=float, default=27.0,
                        help='Scene detection sensitivity (default: 27.0)')
-
-    args = parser.parse_args()
+    parser.add_argument('--engine', default='whisper', choices=sorted(ENGINES),
+                       help='Transcription backend; faster-whisper runs int8 on CPU (default: whisper)')
+    parser.add_argument('--max-models', type=int, default=1,
+                       help='Whisper models kept loaded at once (default: 1, daemon: 2)')
+    parser.add_argument('--chunked-transcription', action='store_true',
+                       help='Skip silence and transcribe speech chunks in parallel processes')
+    parser.add_argument('--transcribe-workers', type=int, default=0,
+                       help='Processes for --chunked-transcription, each with its own model '
+                            '(default: min(4, CPU count))')
+    parser.add_argument('--single-decode', action='store_true',
+                       help='Decode each video once for both transcription and scene detection')
+    parser.add_argument('--frame-width', type=int, default=DEFAULT_FRAME_WIDTH,
+                       help=f'Frame width for single-decode scene detection, 0 = full size (default: {DEFAULT_FRAME_WIDTH})')
+    parser.add_argument('--fast-scenes', action='store_true',
+                       help='Parallel chunked scene detection on downscaled frames (approximate)')
+    parser.add_argument('--frame-skip', type=int, default=0,
+                       help='--fast-scenes: frames skipped between analyzed frames (default: 0)')
+    parser.add_argument('--chunk-seconds', type=float, default=60.0,
+                       help='--fast-scenes: seconds of video per worker chunk (default: 60)')
+    parser.add_argument('--bench-scenes', action='store_true',
+                       help='Report fast vs exact scene detection accuracy and speed, then exit')
+    parser.add_argument('--bench-engines', action='store_true',
+                       help='Report real-time factor and memory per engine and model size on the first video, then exit')
+    parser.add_argument('--bench-models', default='tiny,base,small',
+                       help='Model sizes for --bench-engines (default: %(default)s)')
+    parser.add_argument('--bench-engine-run', help=argparse.SUPPRESS)
+    parser.add_argument('--bench-decode', action='store_true',
+                       help='Benchmark two-pass vs single-decode on the given videos and exit')
+    parser.add_argument('--bench-run', choices=['two-pass', 'single'], help=argparse.SUPPRESS)
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Batch mode: run stages concurrently across videos')
+    parser.add_argument('--scene-workers', type=int, default=os.cpu_count() or 2,
+                       help='Scene detection processes for --pipeline and --fast-scenes (default: CPU count)')
+    parser.add_argument('--remote-workers', type=int, default=2,
+                       help='Concurrent remote analyses in --pipeline mode (default: 2)')
+    parser.add_argument('--queue-size', type=int, default=4,
+                       help='Videos waiting for the remote stage in --pipeline mode (default: 4)')
+    parser.add_argument('--remote-stage', default='gemini', choices=sorted(REMOTE_STAGES),
+                       help='Remote analysis backend; "stub" works offline (default: gemini)')
+    parser.add_argument('--cache', default=str(default_cache_path()),
+                       help='Per-stage result cache (default: %(default)s)')
+    parser.add_argument('--cache-size-mb', type=int, default=2048,
+                       help='Evict least recently used stage cache entries beyond this size; proxies and '
+                            'keyframes are each trimmed to it too (default: 2048)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Neither read nor write the stage cache')
+    parser.add_argument('--refresh-stage', action='append', default=[], choices=CACHE_STAGES,
+                       help='Recompute this stage even if cached (repeatable)')
+    parser.add_argument('--keyframes', type=int, default=0, metavar='N',
+                       help='Send N keyframes per scene plus the full transcript instead of the video')
+    parser.add_argument('--no-proxy', action='store_true',
+                       help='Upload the original file instead of a 360p/2fps analysis proxy')
+    parser.add_argument('--upload-registry', default=str(default_cache_path().parent / 'uploads.json'),
+                       help='Remembers uploaded files so unexpired ones are reused (default: %(default)s)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Skip videos the manifest records as completed with the same options')
+    parser.add_argument('--manifest',
+                       help='Batch checkpoint file (default: OUTPUT_DIR/analysis-manifest.json)')
+    parser.add_argument('--metrics-out', metavar='FILE',
+                       help='Append per-stage and per-video metrics (JSON lines) to FILE')
+    parser.add_argument('--profile', metavar='STAGE',
+                       choices=['transcript', 'scenes', 'decode', 'analysis', 'save', 'video'],
+                       help='cProfile this stage for each video (sequential mode only)')
+    parser.add_argument('--profile-dir', default='.',
+                       help='Where --profile writes <video>.<stage>.prof (default: current directory)')
+    parser.add_argument('--serve', action='store_true',
+                       help='Run the resident analysis daemon instead of analyzing')
+    parser.add_argument('--socket', default=str(default_socket_path()),
+                       help='Daemon socket path (default: %(default)s)')
+    parser.add_argument('--no-daemon', action='store_true',
+                       help='Analyze in this process even if a daemon is running')
+    return parser
+
+def analyze_videos(args):
+    """Analyze every video in `args`; returns the process exit status."""
+    MODELS.max_models = max(MODELS.max_models, args.max_models)
 
     # Load script if provided
     script_content = None
@@ -252,53 +2217,201 @@ Examples:
         else:
             print(f"Warning: Script file not found: {script_path}")
 
-    # Determine output mode
-    if len(args.videos) == 1 and args.output:
-        # Single video mode
-        video_path = Path(args.videos[0])
+    if args.output_dir:
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    else:
         output_path = Path(args.output)
+
+    def output_for(video_path):
+        if args.output_dir:
+            return Path(args.output_dir) / f"{video_path.stem}-analysis.json"
+        return output_path
+
+    missing = [v for v in args.videos if not Path(v).exists()]
+    for video_file in missing:
+        print(f"ERROR: Video not found: {video_file}")
+    args.videos = [v for v in args.videos if v not in missing]
+
+    if args.manifest:
+        manifest_path = Path(args.manifest)
     elif args.output_dir:
-        # Batch mode
-        output_dir = Path(args.output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = Path(args.output_dir) / 'analysis-manifest.json'
     else:
-        parser.error("Use -o for single video or -d for batch mode")
-
-    # Process videos
-    for video_file in args.videos:
-        video_path = Path(video_file)
+        manifest_path = output_path.with_suffix('.manifest.json')
+    manifest = BatchManifest(manifest_path, run_signature(args, script_content), args.resume)
+
+    cache = StageCache(None if args.no_cache else args.cache, args.cache_size_mb << 20, args.refresh_stage)
+    uploads = RemoteUploads(args.upload_registry, proxy=not args.no_proxy, max_bytes=args.cache_size_mb << 20)
+    if args.profile and args.pipeline:
+        print("Warning: --profile only applies without --pipeline; ignoring it")
+    metrics = StageMetrics(args.metrics_out, uploads, None if args.pipeline else args.profile, args.profile_dir)
+    interrupted = False
+    try:
+        with metrics.stage(None, 'run') as run:
+            run.update(videos=len(args.videos), pipeline=args.pipeline, engine=args.engine,
+                       whisper_model=args.whisper_model, remote_stage=args.remote_stage,
+                       signature=manifest.signature)
+            if args.pipeline:
+                run_pipeline(args, script_content, output_for, cache, manifest, uploads, metrics)
+            else:
+                for video_file in args.videos:
+                    video_path = Path(video_file)
+                    if manifest.should_skip(video_path, output_for(video_path)):
+                        continue
+                    with metrics.stage(video_path, 'video') as record:
+                        record['status'] = analyze_one(video_path, args, script_content, output_for(video_path),
+                                                       cache, manifest, uploads, metrics)
+            run.update(completed=len(manifest.completed), skipped=len(manifest.skipped),
+                       failed=len(manifest.failed))
+    except KeyboardInterrupt:
+        interrupted = True
+        for path, entry in manifest.videos.items():
+            if entry.get('status') == 'running':
+                stage = next((st for st in ('transcript', 'scenes', 'analysis', 'save')
+                              if st not in entry['stages']), 'save')
+                manifest.fail(Path(path), stage, 'interrupted', status='interrupted')
+        print("\nInterrupted; rerun with --resume to continue")
+    finally:
+        cache.close()
+        uploads.close()
+        metrics.close()
+
+    print(f"\n{MODELS.summary()}")
+    print(cache.summary())
+    print(uploads.summary())
+    if args.metrics_out:
+        print(f"Metrics: run {metrics.run_id} appended to {args.metrics_out}")
+    manifest.print_summary()
+    print(f"\n{'='*80}")
+    if interrupted:
+        print("✗ BATCH INTERRUPTED")
+    elif manifest.failed or missing:
+        print(f"✗ {len(manifest.failed) + len(missing)} VIDEO(S) FAILED")
+    else:
+        print("✓ ALL VIDEOS ANALYZED SUCCESSFULLY")
+    print(f"{'='*80}\n")
+    if interrupted:
+        return 130
+    return 1 if manifest.failed or missing else 0
 
-        if not video_path.exists():
-            print(f"ERROR: Video not found: {video_path}")
-            continue
+def analyze_one(video_path, args, script_content, output_path, cache, manifest, uploads, metrics):
+    """
+    Run every stage for one video, recording progress and failure in `manifest`.
 
-        print(f"\n{'='*80}")
-        print(f"ANALYZING: {video_path.name}")
-        print(f"{'='*80}")
+    Returns:
+        'ok', or 'error' if a stage failed
+    """
+    print(f"\n{'='*80}")
+    print(f"ANALYZING: {video_path.name}")
+    print(f"{'='*80}")
+
+    manifest.start(video_path, output_path)
+    stage = 'transcript'
+    try:
+        keys = cache.keys_for(video_path, args, script_content)
+        if not args.keyframes and not cache.contains('analysis', keys):
+            # The proxy transcodes while Whisper and scene detection run
+            uploads.prepare(video_path)
+        transcript = cache.get('transcript', keys)
+        scenes = cache.get('scenes', keys)
+
+        if args.single_decode and transcript is None:
+            # Steps 1+2 from one decode. With the transcript cached, only step 2 runs
+            # below, so a changed --scene-threshold doesn't rerun Whisper.
+            with metrics.stage(video_path, 'decode'):
+                transcript, scenes = decode_once(video_path, args.whisper_model, args.scene_threshold,
+                                                 args.frame_width, chunk_workers=chunk_workers(args),
+                                                 engine=args.engine)
+            cache.put('transcript', keys, transcript)
+            cache.put('scenes', keys, scenes)
 
         # Step 1: Transcribe with Whisper
-        transcript = transcribe_with_whisper(video_path, args.whisper_model)
+        if transcript is None:
+            with metrics.stage(video_path, 'transcript'):
+                transcript = transcribe(video_path, args)
+            cache.put('transcript', keys, transcript)
+        manifest.stage_done(video_path, 'transcript')
 
         # Step 2: Detect scenes
-        scenes = detect_scenes(video_path, args.scene_threshold)
+        stage = 'scenes'
+        if scenes is None:
+            with metrics.stage(video_path, 'scenes'):
+                if args.fast_scenes:
+                    scenes = detect_scenes_fast(video_path, args.scene_threshold, args.scene_workers,
+                                                args.frame_width, args.frame_skip, args.chunk_seconds)
+                else:
+                    scenes = detect_scenes(video_path, args.scene_threshold)
+            cache.put('scenes', keys, scenes)
+        manifest.stage_done(video_path, 'scenes')
 
         # Step 3: Analyze with Gemini
-        gemini_analysis = analyze_with_gemini(
-            video_path,
-            transcript,
-            scenes,
-            script_content
-        )
+        stage = 'analysis'
+        gemini_analysis = cache.get('analysis', keys)
+        if gemini_analysis is None:
+            with metrics.stage(video_path, 'analysis') as record:
+                gemini_analysis = remote_stage_for(args)(
+                    video_path,
+                    transcript,
+                    scenes,
+                    script_content,
+                    uploads
+                )
+                # Proxy, upload and remote processing time within this stage
+                record.update(uploads.per_video.get(str(video_path), {}))
+            cache.put('analysis', keys, gemini_analysis)
+        manifest.stage_done(video_path, 'analysis')
 
         # Save results
-        if args.output_dir:
-            output_path = Path(args.output_dir) / f"{video_path.stem}-analysis.json"
+        stage = 'save'
+        with metrics.stage(video_path, 'save'):
+            save_results(output_path, transcript, scenes, gemini_analysis)
+        manifest.stage_done(video_path, 'save')
+    except Exception as exc:
+        print(f"ERROR: {video_path.name}: {stage} failed: {exc}")
+        manifest.fail(video_path, stage, exc)
+        return 'error'
+    manifest.complete(video_path)
+    return 'ok'
 
-        save_results(output_path, transcript, scenes, gemini_analysis)
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
 
-    print(f"\n{'='*80}")
-    print("✓ ALL VIDEOS ANALYZED SUCCESSFULLY")
-    print(f"{'='*80}\n")
+    if args.serve:
+        serve(args)
+        return
+
+    if not args.videos:
+        parser.error("No videos given")
+    benchmark = (args.bench_run or args.bench_engine_run or args.bench_engines
+                 or args.bench_decode or args.bench_scenes)
+    if benchmark and os.getenv('ANALYZE_VIDEO_REQUIRE_DAEMON'):
+        # Benchmarks always run locally; bin/analyze-video must retry them in the venv
+        sys.exit(75)
+    if args.bench_run:
+        sys.exit(bench_run(args))
+    if args.bench_engine_run:
+        sys.exit(bench_engine_run(args))
+    if args.bench_engines:
+        sys.exit(bench_engines(args))
+    if args.bench_decode:
+        sys.exit(bench_decode(args))
+    if args.bench_scenes:
+        sys.exit(bench_scenes(args))
+
+    # Determine output mode
+    if not ((len(args.videos) == 1 and args.output) or args.output_dir):
+        parser.error("Use -o for single video or -d for batch mode")
+
+    if not args.no_daemon:
+        status = submit_to_daemon(args)
+        if status is not None:
+            sys.exit(status)
+        if os.getenv('ANALYZE_VIDEO_REQUIRE_DAEMON'):
+            # bin/analyze-video ran us outside the venv; let it retry there
+            sys.exit(75)
+
+    sys.exit(analyze_videos(args))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for build_collections.py.
+
+- walk: generates a synthetic media tree (movie folders with extras, featurettes, subtitle
+  folders and samples, plus loose files) and times the current scandir walker against the
+  old rglob-based walk.
+- library: end-to-end run over a synthetic library of N titles against a local mock TMDB server
+  (configurable latency and rate limit). Reports scan time, titles/s, HTTP calls per title,
+  cache hit rate and peak RSS for a cold run without collection prefetch, a cold run and a
+  warm rerun, plus per-name timings for
+  parse_title_year() and normalize_base(). Each run is a separate process so peak RSS is its own.
+- parse: times the batch parse_titles() against the old per-item parse_title_year() +
+  normalize_base() path on N synthetic names (optionally under cProfile).
+- offline: builds an OfflineIndex from a synthetic N-row TMDB ID export and times ingest, exact
+  lookups and fuzzy lookups (misspelled titles), against the old OR-of-every-trigram query.
+- check: regression checks for behaviour the benchmarks can't show as a number (exits 1 on
+  any failure).
+
+Usage:
+  python scripts/bench_collections.py walk --entries 50000
+  python scripts/bench_collections.py walk --entries 50000 --root /tmp/bench-media --keep
+  python scripts/bench_collections.py library --titles 10000 --latency-ms 20 --server-rate 50
+  python scripts/bench_collections.py library --titles 1000 --json results.json
+  python scripts/bench_collections.py parse --names 100000 --profile
+  python scripts/bench_collections.py offline --rows 1000000
+  python scripts/bench_collections.py check
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import gzip
+import itertools
+import json
+import pstats
+import re
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import build_collections as bc  # noqa: E402
+
+
+WORDS = [
+    "Alien", "Alone", "Amazing", "Beyond", "Blade", "Blood", "Brave", "Christmas", "City", "Dark",
+    "Dawn", "Dead", "Die", "Dragon", "Dream", "Edge", "Empire", "Fast", "Fire", "Forest", "Ghost",
+    "Hard", "Heart", "Home", "Hunter", "Ice", "Island", "Jungle", "King", "Knight", "Last", "Legend",
+    "Light", "Lost", "Machine", "Midnight", "Mission", "Moon", "Night", "Ocean", "Planet", "Power",
+    "Quest", "Rain", "Red", "Return", "Rise", "River", "Road", "Shadow", "Silent", "Sky", "Star",
+    "Storm", "Story", "Summer", "Sun", "Toy", "Train", "War", "Water", "Wild", "Winter", "World",
+]
+QUALITY = ["1080p", "720p", "2160p", "BluRay", "WEBRip", "x264", "x265", "HEVC", "HDR", "AAC", "DTS"]
+SEQUELS = ["", "", "", " 2", " 3", " II", " Part Two", ": The Return", " - Reloaded"]
+
+
+def release_name(rng: random.Random) -> Tuple[str, int]:
+    """A plausible title plus year, e.g. ("Dark Planet 2", 1997)."""
+    title = " ".join(rng.sample(WORDS, rng.randint(1, 3))) + rng.choice(SEQUELS)
+    return title, rng.randint(1950, 2024)
+
+
+def release_names(rng: random.Random) -> List[Tuple[str, int]]:
+    """One release, or now and then a whole franchise (base title plus sequels) so collections have members."""
+    if rng.random() >= 0.15:
+        return [release_name(rng)]
+    base = " ".join(rng.sample(WORDS, rng.randint(1, 2)))
+    year = rng.randint(1950, 2015)
+    entries = [base] + [base + suffix for suffix in (" 2", " 3", " 4")[:rng.randint(1, 3)]]
+    return [(title, year + 3 * n) for n, title in enumerate(entries)]
+
+
+def folder_name(rng: random.Random, title: str, year: int) -> str:
+    style = rng.random()
+    if style < 0.6:
+        return f"{title} ({year})"
+    if style < 0.85:
+        tags = " ".join(rng.sample(QUALITY, 2))
+        return f"{title} {tags} ({year})"
+    # Scene-style dotted name with no parenthesised year: only recognised by its contents.
+    return ".".join(title.replace(":", "").split()) + f".{year}." + ".".join(rng.sample(QUALITY, 2))
+
+
+def make_tree(root: Path, entries: Optional[int] = None, seed: int = 0, titles_wanted: Optional[int] = None) -> int:
+    """
+    Create roughly `entries` files/dirs (or `titles_wanted` titles) under `root`.
+
+    Returns the number of movie titles created.
+    """
+    rng = random.Random(seed)
+    created = 0
+    titles = 0
+    categories = [root / "movies", root / "movies-kids"]
+    for cat in categories:
+        cat.mkdir(parents=True, exist_ok=True)
+        created += 1
+    while (entries is None or created < entries) and (titles_wanted is None or titles < titles_wanted):
+        for title, year in release_names(rng):
+            if titles_wanted is not None and titles >= titles_wanted:
+                break
+            cat = rng.choice(categories)
+            if rng.random() < 0.1:
+                # Loose file straight in the category folder.
+                (cat / f"{title} ({year}).mkv").touch()
+                created += 1
+                titles += 1
+                continue
+            folder = cat / folder_name(rng, title, year)
+            if folder.exists():
+                continue
+            folder.mkdir()
+            (folder / f"{title} ({year}).mkv").touch()
+            (folder / f"{title} ({year}).en.srt").touch()
+            created += 3
+            if rng.random() < 0.5:
+                (folder / "sample.mkv").touch()
+                created += 1
+            if rng.random() < 0.4:
+                subs = folder / "Subs"
+                subs.mkdir()
+                for lang in ("en", "es", "fr"):
+                    (subs / f"{lang}.srt").touch()
+                created += 4
+            if rng.random() < 0.3:
+                extras = folder / "Featurettes"
+                extras.mkdir()
+                for n in range(rng.randint(1, 4)):
+                    (extras / f"Behind the Scenes {n + 1}.mkv").touch()
+                    created += 1
+                created += 1
+            titles += 1
+    return titles
+
+
+def legacy_walk_media(paths: List[str]) -> List[bc.MediaItem]:
+    """The original Path.rglob walk: every directory and every video file becomes an item."""
+    found: List[bc.MediaItem] = []
+    for root in paths:
+        p = Path(root)
+        if not p.exists():
+            continue
+        for entry in p.rglob("*"):
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                title, year = bc.parse_title_year(entry.name)
+                found.append(bc.MediaItem(title=title, year=year, path=entry))
+            elif entry.is_file() and entry.suffix.lower() in bc.VIDEO_EXTS:
+                title, year = bc.parse_title_year(entry.stem)
+                found.append(bc.MediaItem(title=title, year=year, path=entry))
+    return found
+
+
+def timed(fn: Callable[[], list], repeat: int) -> Tuple[float, list]:
+    best = float("inf")
+    result: list = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_walk(args: argparse.Namespace) -> None:
+    root = Path(args.root) if args.root else Path(tempfile.mkdtemp(prefix="bench-media-"))
+    try:
+        start = time.perf_counter()
+        titles = make_tree(root, args.entries, seed=args.seed)
+        print(f"Generated ~{args.entries} entries ({titles} titles) under {root} "
+              f"in {time.perf_counter() - start:.1f}s")
+        paths = [str(root / "movies"), str(root / "movies-kids")]
+
+        legacy_t, legacy_items = timed(lambda: legacy_walk_media(paths), args.repeat)
+        new_t, new_items = timed(lambda: bc.walk_media(paths), args.repeat)
+        _, listed, _ = bc._scan_roots(paths, None)
+
+        print(f"{'walker':<10} {'best s':>8} {'items':>8} {'items/title':>12}")
+        print(f"{'rglob':<10} {legacy_t:>8.3f} {len(legacy_items):>8} {len(legacy_items) / titles:>12.2f}")
+        print(f"{'scandir':<10} {new_t:>8.3f} {len(new_items):>8} {len(new_items) / titles:>12.2f}")
+        print(f"scandir opened {listed} directories; speedup {legacy_t / new_t:.1f}x, "
+              f"{len(legacy_items) - len(new_items)} fewer TMDB lookups")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+class MockTMDB:
+    """
+    Local stand-in for the TMDB endpoints build_collections uses, in a background thread.
+
+    Every searched title "exists": its id is a CRC of the canonical title, details echo the
+    title back, and titles sharing a normalize_base() fall into one collection for roughly a third
+    of the bases, so prefetching and grouping have something to do. `catalog` registers the
+    library's titles up front, so a collection's parts list already names members nobody has
+    searched for yet, as on real TMDB. `latency_ms` delays every response; `rate` caps
+    requests/second and answers 429 with Retry-After beyond it.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, rate: float = 0.0, catalog: Iterable[str] = ()) -> None:
+        self.latency = latency_ms / 1000.0
+        self.limiter = bc.TokenBucket(rate) if rate > 0 else None
+        self.calls: Counter = Counter()
+        self.titles: Dict[int, str] = {}
+        self.members: Dict[int, Dict[int, str]] = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        for title in catalog:
+            self._register(title)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/3"
+
+    def __enter__(self) -> "MockTMDB":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _over_limit(self) -> bool:
+        return self.limiter is not None and not self.limiter.try_acquire()
+
+    @staticmethod
+    def _collection_id(title: str) -> Optional[int]:
+        base = bc.normalize_base(title)
+        crc = zlib.crc32(base.encode("utf-8"))
+        return crc % 1000003 + 1 if crc % 3 == 0 else None
+
+    def _register(self, title: str) -> int:
+        movie_id = zlib.crc32(bc.canonical_title(title).encode("utf-8")) % 10000019 + 1
+        with self.lock:
+            self.titles.setdefault(movie_id, title)
+            coll = self._collection_id(title)
+            if coll is not None:
+                self.members.setdefault(coll, {})[movie_id] = self.titles[movie_id]
+        return movie_id
+
+    def respond(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, dict]:
+        if path.endswith("/search/movie"):
+            title = query.get("query", [""])[0]
+            return 200, {"results": [{"id": self._register(title), "title": title}]}
+        if "/movie/" in path:
+            movie_id = int(path.rsplit("/", 1)[1])
+            with self.lock:
+                title = self.titles.get(movie_id)
+            if title is None:
+                return 404, {}
+            body = {"id": movie_id, "title": title, "belongs_to_collection": None}
+            coll = self._collection_id(title)
+            if coll is not None:
+                body["belongs_to_collection"] = {"id": coll, "name": f"{bc.normalize_base(title).title()} Collection"}
+            return 200, body
+        if "/collection/" in path:
+            coll = int(path.rsplit("/", 1)[1])
+            with self.lock:
+                parts = [{"id": mid, "title": t} for mid, t in sorted(self.members.get(coll, {}).items())]
+            name = f"{bc.normalize_base(parts[0]['title']).title()} Collection" if parts else ""
+            return 200, {"id": coll, "name": name, "parts": parts}
+        return 404, {}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this Nagle + delayed ACK
+            # adds ~40ms to every keep-alive response.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                url = urllib.parse.urlsplit(self.path)
+                endpoint = url.path.rsplit("/", 1)[0] if url.path[-1:].isdigit() else url.path
+                with mock.lock:
+                    mock.calls[endpoint] += 1
+                if mock.latency:
+                    time.sleep(mock.latency)
+                if mock._over_limit():
+                    status, body = 429, {"status_message": "rate limited"}
+                else:
+                    status, body = mock.respond(url.path, urllib.parse.parse_qs(url.query))
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def run_once(args: argparse.Namespace) -> None:
+    """Child process: one scan + resolve pass, metrics printed as a JSON line."""
+    start = time.perf_counter()
+    items = bc.walk_media(args.paths)
+    scan_s = time.perf_counter() - start
+    client = bc.TMDBClient("bench", base_url=args.tmdb_url, rate=args.rate_limit)
+    cache = bc.TMDBCache(Path(args.cache))
+    stats = bc.ResolveStats()
+    try:
+        start = time.perf_counter()
+        bc.build_collections(client, items, cache, workers=args.workers, stats=stats, prefetch=args.prefetch)
+        resolve_s = time.perf_counter() - start
+    finally:
+        client.close()
+        cache.close()
+    print(json.dumps({
+        "items": len(items),
+        "scan_s": scan_s,
+        "resolve_s": resolve_s,
+        "jobs": stats.jobs,
+        "cache_hits": stats.cache_hits,
+        "http_calls": client.calls,
+        "collections_fetched": stats.collections_fetched,
+        "details_avoided": stats.details_avoided,
+        "retried": client.retried,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def per_name_us(fn: Callable[[str], object], names: List[str]) -> float:
+    start = time.perf_counter()
+    for name in names:
+        fn(name)
+    return (time.perf_counter() - start) / max(1, len(names)) * 1e6
+
+
+def bench_library(args: argparse.Namespace) -> None:
+    root = Path(args.root) if args.root else Path(tempfile.mkdtemp(prefix="bench-library-"))
+    workdir = Path(tempfile.mkdtemp(prefix="bench-cache-"))
+    try:
+        start = time.perf_counter()
+        titles = make_tree(root, seed=args.seed, titles_wanted=args.titles)
+        print(f"Generated {titles} titles under {root} in {time.perf_counter() - start:.1f}s")
+        paths = [str(root / "movies"), str(root / "movies-kids")]
+
+        library = bc.walk_media(paths)
+        names = [item.path.name for item in library]
+        parse_us = per_name_us(bc.parse_title_year, names)
+        norm_us = per_name_us(bc.normalize_base, names)
+
+        results = {"titles": titles, "parse_title_year_us": parse_us, "normalize_base_us": norm_us, "runs": {}}
+        catalog = [item.title for item in library]
+        with MockTMDB(latency_ms=args.latency_ms, rate=args.server_rate, catalog=catalog) as mock:
+            def run(cache: str, *extra: str) -> dict:
+                cmd = [
+                    sys.executable, __file__, "run-once", "--tmdb-url", mock.url, "--cache", str(workdir / cache),
+                    "--workers", str(args.workers), "--rate-limit", str(args.rate_limit), "--paths", *paths, *extra,
+                ]
+                out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+                return json.loads(out.strip().splitlines()[-1])
+
+            # A cold run without collection prefetch, on its own cache, is the baseline for its savings.
+            results["runs"]["cold-np"] = run("noprefetch.sqlite", "--no-prefetch")
+            mock.calls.clear()
+            for phase in ("cold", "warm"):
+                results["runs"][phase] = run("cache.sqlite")
+            results["server_calls"] = dict(mock.calls)
+
+        print(f"parse_title_year: {parse_us:.1f} us/name   normalize_base: {norm_us:.1f} us/name")
+        print(f"{'run':<6} {'scan s':>8} {'resolve s':>10} {'titles/s':>10} {'calls/title':>12} "
+              f"{'hit rate':>9} {'peak RSS MB':>12}")
+        for phase, run in results["runs"].items():
+            total = run["scan_s"] + run["resolve_s"]
+            hit_rate = run["cache_hits"] / run["jobs"] if run["jobs"] else 0.0
+            print(f"{phase:<6} {run['scan_s']:>8.2f} {run['resolve_s']:>10.2f} {titles / total:>10.0f} "
+                  f"{run['http_calls'] / titles:>12.2f} {hit_rate:>9.1%} {run['peak_rss_mb']:>12.1f}")
+        cold, baseline = results["runs"]["cold"], results["runs"]["cold-np"]
+        print(f"collection prefetch: {cold['collections_fetched']} collections fetched, "
+              f"{cold['details_avoided']} detail calls avoided, "
+              f"{cold['http_calls'] - baseline['http_calls']:+d} calls vs cold-np (no prefetch)")
+        print(f"server calls by endpoint (cold + warm): {results['server_calls']}")
+        if args.json:
+            Path(args.json).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+            print(f"Wrote {args.json}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def legacy_parse_title_year(name: str) -> Tuple[str, Optional[int]]:
+    """parse_title_year() as of d6e1732, verbatim: inline patterns, no memoization."""
+    base = name
+    year = None
+    m = bc.YEAR_RE.search(name)
+    if m:
+        year = int(m.group(1))
+        base = bc.YEAR_RE.sub("", name).strip()
+    # Strip common quality/codec/resolution tokens tacked onto folder names.
+    base = re.sub(r"\b(480p|720p|1080p|2160p|4k|x264|x265|h264|h265|bluray|webrip|web-dl|hdr|hevc|aac|dts|ac3)\b",
+                  "", base, flags=re.IGNORECASE)
+    base = re.sub(r"\s+", " ", base).strip()
+    return base, year
+
+
+def legacy_normalize_base(title: str) -> str:
+    """
+    normalize_base() as of d6e1732, verbatim.
+
+    Its split pattern, r"[\\s._-]+", matches a backslash or the letter "s" instead of
+    whitespace, so its group keys are wrong; parse's mismatch count shows how often.
+    """
+    t = bc.YEAR_RE.sub("", title)
+    for sep in bc.SEPARATORS:
+        if sep in t:
+            t = t.split(sep)[0]
+            break
+    t = t.replace("&", "and")
+    tokens = re.split(r"[\\s._-]+", t.lower())
+
+    # Convert leading number words to digits.
+    out: List[str] = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i] in bc.NUM_WORDS:
+            j = i
+            seq: List[str] = []
+            while j < len(tokens) and tokens[j] in bc.NUM_WORDS:
+                seq.append(tokens[j])
+                j += 1
+            num_val = bc.words_to_number(seq)
+            if num_val is not None:
+                out.append(str(num_val))
+                i = j
+                continue
+        out.append(tokens[i])
+        i += 1
+
+    while out and (out[-1].isdigit() or out[-1] in bc.ROMAN):
+        out.pop()
+    return " ".join(out).strip()
+
+
+def synthetic_names(count: int, seed: int = 0) -> List[str]:
+    """Folder/file names as a scan would see them, including mirrored duplicates."""
+    rng = random.Random(seed)
+    names: List[str] = []
+    while len(names) < count:
+        title, year = release_name(rng)
+        name = folder_name(rng, title, year)
+        names.append(name)
+        if rng.random() < 0.3:
+            # Same title on the mirror root, or as a loose file next to its folder.
+            names.append(name if rng.random() < 0.5 else f"{title} ({year})")
+    return names[:count]
+
+
+def bench_parse(args: argparse.Namespace) -> None:
+    names = synthetic_names(args.names, seed=args.seed)
+    print(f"{len(names)} names, {len(set(names))} distinct")
+
+    def legacy() -> list:
+        # What the scan + grouping path did per item: parse, then group key.
+        out = []
+        for name in names:
+            title, year = legacy_parse_title_year(name)
+            out.append((title, year, legacy_normalize_base(title)))
+        return out
+
+    def batch() -> list:
+        return bc.parse_titles(names)
+
+    def clear() -> None:
+        for fn in (bc.parse_title_year, bc.normalize_base, bc.canonical_title):
+            fn.cache_clear()
+
+    legacy_t, legacy_out = timed(legacy, args.repeat)
+    clear()
+    start = time.perf_counter()
+    batch_out = batch()
+    cold_t = time.perf_counter() - start
+    warm_t, _ = timed(batch, args.repeat)
+    mismatches = sum(1 for a, b in zip(legacy_out, batch_out) if a != (b.title, b.year, b.base))
+
+    print(f"{'path':<22} {'s':>8} {'us/name':>9}")
+    for label, secs in (("per-item (old)", legacy_t), ("parse_titles (cold)", cold_t), ("parse_titles (warm)", warm_t)):
+        print(f"{label:<22} {secs:>8.3f} {secs / len(names) * 1e6:>9.2f}")
+    print(f"speedup cold {legacy_t / cold_t:.1f}x, warm {legacy_t / warm_t:.1f}x; {mismatches} mismatches vs old path")
+
+    if args.profile:
+        for label, fn in (("per-item (old)", legacy), ("parse_titles (cold)", batch)):
+            clear()
+            prof = cProfile.Profile()
+            prof.runcall(fn)
+            print(f"\n--- {label} ---")
+            pstats.Stats(prof).sort_stats("cumulative").print_stats(8)
+
+
+def legacy_fuzzy_candidates(index: bc.OfflineIndex, norm: str) -> List[tuple]:
+    """OfflineIndex._fuzzy_candidates() as it was: every trigram ORed, the whole match ranked."""
+    grams = sorted(g for g in bc.trigrams(norm) if g.strip() and len(g.strip()) == 3)
+    if not grams:
+        return []
+    query = " OR ".join('"' + g.replace('"', '""') + '"' for g in grams)
+    return index.conn.execute(
+        "SELECT m.id, m.norm, m.popularity FROM titles_fts f JOIN movies m ON m.id = f.rowid "
+        "WHERE titles_fts MATCH ? ORDER BY f.rank LIMIT 50",
+        (query,),
+    ).fetchall()
+
+
+def misspell(rng: random.Random, title: str) -> str:
+    """Drop, double or swap one letter, the way folder names tend to be wrong."""
+    i = rng.randrange(1, len(title) - 1)
+    op = rng.random()
+    if op < 0.33:
+        return title[:i] + title[i + 1:]
+    if op < 0.66:
+        return title[:i] + title[i] + title[i:]
+    return title[:i - 1] + title[i] + title[i - 1] + title[i + 1:]
+
+
+def export_titles(rng: random.Random, rows: int) -> Iterable[str]:
+    """
+    Titles for a synthetic TMDB export, over a vocabulary as wide as the real one.
+
+    release_name()'s few dozen words would make every trigram common, which is the one case
+    no candidate filter can help; real exports have ~100k distinct words in a Zipf spread.
+    """
+    letters = "etaoinshrdlcumwfgypbvkjxqz"
+    letter_weights = list(itertools.accumulate(
+        [127, 91, 82, 75, 70, 67, 63, 61, 60, 43, 40, 28, 28, 24, 24, 22, 20, 20, 19, 15, 10, 8, 2, 2, 1, 1]
+    ))
+    vocab = list(dict.fromkeys(
+        "".join(rng.choices(letters, cum_weights=letter_weights, k=rng.randint(3, 9))).capitalize()
+        for _ in range(60000)
+    ))
+    zipf = list(itertools.accumulate(1 / rank for rank in range(1, len(vocab) + 1)))
+    for _ in range(rows):
+        words = rng.choices(vocab, cum_weights=zipf, k=rng.randint(1, 4))
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(WORDS))
+        yield " ".join(words)
+
+
+def bench_offline(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="bench-offline-"))
+    try:
+        export = workdir / "movie_ids.json.gz"
+        titles = []
+        with gzip.open(export, "wt", encoding="utf-8") as fh:
+            for movie_id, title in enumerate(export_titles(rng, args.rows), 1):
+                titles.append(title)
+                fh.write(json.dumps({"id": movie_id, "original_title": title, "popularity": rng.random() * 100}) + "\n")
+        index = bc.OfflineIndex(workdir / "offline.sqlite")
+        if not index.fuzzy:
+            print("SQLite has no FTS5 trigram tokenizer; nothing to benchmark")
+            return
+        start = time.perf_counter()
+        index.ingest_export(export)
+        print(f"Ingested {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        exact = rng.sample(titles, args.lookups)
+        fuzzy = [misspell(rng, title) for title in rng.sample([t for t in titles if len(t) > 6], args.lookups)]
+        known = {bc.canonical_title(title) for title in titles}
+        # A misspelling that is itself a title in the export would resolve exactly.
+        fuzzy = [name for name in fuzzy if bc.canonical_title(name) not in known]
+
+        def per_lookup_ms(fn: Callable[[str], object], names: List[str]) -> Tuple[float, list]:
+            start = time.perf_counter()
+            out = [fn(name) for name in names]
+            return (time.perf_counter() - start) / max(1, len(names)) * 1e3, out
+
+        exact_ms, _ = per_lookup_ms(index.lookup, exact)
+        norms = [bc.canonical_title(name) for name in fuzzy]
+        new_ms, new_out = per_lookup_ms(index.fuzzy_lookup, norms)
+        old_ms, old_out = per_lookup_ms(lambda n: index._best_candidate(n, legacy_fuzzy_candidates(index, n)), norms)
+        found = sum(1 for hit in new_out if hit is not None)
+        differ = sum(1 for a, b in zip(new_out, old_out) if a != b)
+        print(f"{'lookup':<26} {'ms/lookup':>10}")
+        print(f"{'exact':<26} {exact_ms:>10.3f}")
+        print(f"{'fuzzy, rarest trigrams':<26} {new_ms:>10.3f}")
+        print(f"{'fuzzy, every trigram (old)':<26} {old_ms:>10.3f}")
+        print(f"{len(norms)} misspelled titles: {found} resolved, {differ} answers differ from the old query; "
+              f"speedup {old_ms / new_ms:.1f}x")
+        index.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def check_matcher() -> List[str]:
+    """Overlapping curated patterns must all report their collections."""
+    matcher = bc.CuratedMatcher({
+        "The": ["re:^the"], "Matrix": ["re:^the matrix"], "Word": ["word:matrix"], "Plain": ["atri"],
+    })
+    failures = []
+    for title, want in (
+        ("The Matrix", ["The", "Matrix", "Word", "Plain"]),
+        ("Thematrix", ["The", "Plain"]),
+        ("Heat", []),
+    ):
+        got = matcher.match(title)
+        if sorted(got) != sorted(want):
+            failures.append(f"CuratedMatcher.match({title!r}) = {got}, expected {want}")
+    return failures
+
+
+def check_prefetch(titles: int = 300, seed: int = 0) -> List[str]:
+    """Collection prefetch must never cost more TMDB calls than resolving without it."""
+    root = Path(tempfile.mkdtemp(prefix="check-prefetch-"))
+    try:
+        make_tree(root, seed=seed, titles_wanted=titles)
+        items = bc.walk_media([str(root / "movies"), str(root / "movies-kids")])
+        calls = {}
+        with MockTMDB(catalog=[item.title for item in items]) as mock:
+            for prefetch in (False, True):
+                client = bc.TMDBClient("check", base_url=mock.url, rate=0)
+                cache = bc.TMDBCache(root / f"cache-{prefetch}.sqlite")
+                try:
+                    bc.build_collections(client, items, cache, prefetch=prefetch)
+                finally:
+                    client.close()
+                    cache.close()
+                calls[prefetch] = client.calls
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    if calls[True] > calls[False]:
+        return [f"prefetch made {calls[True]} TMDB calls, {calls[True] - calls[False]} more than without it"]
+    return []
+
+
+CHECKS = {"matcher": check_matcher, "prefetch": check_prefetch}
+
+
+def run_checks(args: argparse.Namespace) -> int:
+    failed = 0
+    for name, check in CHECKS.items():
+        failures = check()
+        print(f"{name:<10} {'ok' if not failures else 'FAILED'}")
+        for failure in failures:
+            print(f"  {failure}")
+        failed += bool(failures)
+    return 1 if failed else 0
+
+
+def main() -> Optional[int]:
+    parser = argparse.ArgumentParser(description="Benchmarks for build_collections.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    walk = sub.add_parser("walk", help="Scanner benchmark on a synthetic media tree")
+    walk.add_argument("--entries", type=int, default=50000, help="Approximate files+dirs to generate")
+    walk.add_argument("--root", help="Where to build the tree (default: a temp dir)")
+    walk.add_argument("--keep", action="store_true", help="Keep the generated tree")
+    walk.add_argument("--repeat", type=int, default=3, help="Runs per walker (best is reported)")
+    walk.add_argument("--seed", type=int, default=0)
+    walk.set_defaults(func=bench_walk)
+
+    lib = sub.add_parser("library", help="Cold/warm end-to-end runs against a mock TMDB server")
+    lib.add_argument("--titles", type=int, default=1000, help="Titles to generate (1k-100k)")
+    lib.add_argument("--latency-ms", type=float, default=20.0, help="Mock server latency per request")
+    lib.add_argument("--server-rate", type=float, default=0.0,
+                     help="Mock server rate limit in requests/second (0 = unlimited)")
+    lib.add_argument("--workers", type=int, default=bc.DEFAULT_WORKERS)
+    lib.add_argument("--rate-limit", type=float, default=bc.DEFAULT_RATE, help="Client-side rate limit")
+    lib.add_argument("--root", help="Where to build the library (default: a temp dir)")
+    lib.add_argument("--keep", action="store_true", help="Keep the generated library")
+    lib.add_argument("--json", help="Also write the results to this JSON file")
+    lib.add_argument("--seed", type=int, default=0)
+    lib.set_defaults(func=bench_library)
+
+    parse = sub.add_parser("parse", help="Batch title parsing vs the old per-item path")
+    parse.add_argument("--names", type=int, default=100000)
+    parse.add_argument("--repeat", type=int, default=3)
+    parse.add_argument("--profile", action="store_true", help="Also print cProfile stats for both paths")
+    parse.add_argument("--seed", type=int, default=0)
+    parse.set_defaults(func=bench_parse)
+
+    once = sub.add_parser("run-once", help=argparse.SUPPRESS)
+    once.add_argument("--paths", nargs="+", required=True)
+    once.add_argument("--tmdb-url", required=True)
+    once.add_argument("--cache", required=True)
+    once.add_argument("--workers", type=int, default=bc.DEFAULT_WORKERS)
+    once.add_argument("--rate-limit", type=float, default=bc.DEFAULT_RATE)
+    once.add_argument("--no-prefetch", dest="prefetch", action="store_false")
+    once.set_defaults(func=run_once)
+
+    offline = sub.add_parser("offline", help="OfflineIndex ingest and lookup timings on a synthetic export")
+    offline.add_argument("--rows", type=int, default=200000, help="Rows in the synthetic export (~1M for TMDB's)")
+    offline.add_argument("--lookups", type=int, default=200)
+    offline.add_argument("--seed", type=int, default=0)
+    offline.set_defaults(func=bench_offline)
+
+    check = sub.add_parser("check", help="Regression checks (exit status 1 on failure)")
+    check.set_defaults(func=run_checks)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
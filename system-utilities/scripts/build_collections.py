@@ -2,10 +2,15 @@
 """
 Build Kometa collection YAML from local media using TMDB collections and curated fallbacks.
 
-- Scans /media and /mnt/sdcard recursively for movie folders/files.
+- Scans /media and /mnt/sdcard for movie folders/files (one item per title; extras inside a
+  movie folder are not descended into).
 - Resolves TMDB IDs (search + year), then fetches belongs_to_collection to group franchises.
+  Lookups run on a small thread pool over keep-alive connections, rate limited to stay under
+  TMDB's request ceiling and retried with backoff on 429/5xx.
 - Adds curated manual groups for franchises without TMDB collections (duologies, remakes, etc.).
 - Emits a YAML file suitable for Kometa `collection_files`.
+- With --watch, stays resident and rebuilds when titles are added or removed (inotify, with a
+  polling fallback), rewriting the YAML only when its content changes.
 
 Usage:
   python scripts/build_collections.py \
@@ -16,16 +21,31 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import ctypes
+import ctypes.util
+import errno
+import gzip
+import hashlib
+import http.client
+import itertools
 import json
+import math
 import os
+import random
 import re
+import select
+import sqlite3
 import sys
+import tempfile
+import threading
+import time
 from collections import defaultdict
-from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 
-import urllib.request
 import urllib.parse
 
 
@@ -36,12 +56,60 @@ SCAN_ROOTS = [
     "/mnt/sdcard/movies-kids",
 ]
 
-# Simple cache to avoid hammering TMDB.
-DEFAULT_CACHE = Path("generated/kometa/tmdb_cache.json")
+# Resolution cache so warm runs never touch TMDB.
+DEFAULT_CACHE = Path("generated/kometa/tmdb_cache.sqlite")
+DEFAULT_TTL_DAYS = 30.0
+# Titles TMDB doesn't know (yet) are retried sooner than resolved ones.
+MISS_TTL_DAYS = 7.0
 DEFAULT_OUT = Path("generated/kometa/collections.yml")
+# Directory mtimes/inodes from the previous scan, used by --incremental.
+DEFAULT_MANIFEST = Path("generated/kometa/scan_manifest.json")
+MANIFEST_VERSION = 4
+
+# Local title index built from TMDB's daily ID exports, used by --offline.
+DEFAULT_OFFLINE_DB = Path("generated/kometa/tmdb_offline.sqlite")
+FUZZY_THRESHOLD = 0.6
+# Reusing an already-resolved title for a near-identical name needs a much closer match.
+FUZZY_CACHE_THRESHOLD = 0.85
+
+VIDEO_EXTS = {".mkv", ".mp4", ".avi", ".mov", ".m4v"}
+# Plex-style extras next to a main feature: "Heat-trailer.mkv", "sample.mkv", "Heat.sample.mkv".
+# Only suffixes count, so "Interview with the Vampire" or "Extras (2009)" stay movies.
+EXTRA_RE = re.compile(
+    r"(?:^|[-.])sample$|-(?:trailer|featurette|behindthescenes|deleted|interview|scene|short|other)$",
+    re.IGNORECASE,
+)
+# Subfolders of a movie folder that hold extras or subtitles rather than titles.
+EXTRA_DIRS = {
+    "behind the scenes", "deleted scenes", "extras", "featurettes", "interviews", "other",
+    "sample", "samples", "scenes", "shorts", "subs", "subtitles", "trailers",
+}
+
+TMDB_API = "https://api.themoviedb.org/3"
+# TMDB allows roughly 50 requests/second per IP; stay comfortably under it.
+DEFAULT_RATE = 40.0
+DEFAULT_WORKERS = 8
+# A collection's parts list costs one call and saves a details call for each further member it
+# answers, so it only pays off once a franchise has this many titles waiting to resolve.
+PREFETCH_MIN_GROUP = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 YEAR_RE = re.compile(r"\s*\((\d{4})\)$")
+# Common quality/codec/resolution tokens tacked onto folder names.
+QUALITY_RE = re.compile(
+    r"\b(480p|720p|1080p|2160p|4k|x264|x265|h264|h265|bluray|webrip|web-dl|hdr|hevc|aac|dts|ac3)\b",
+    re.IGNORECASE,
+)
+SPACES_RE = re.compile(r"\s+")
+BASE_SPLIT_RE = re.compile(r"[\s._-]+")
+CANON_SPLIT_RE = re.compile(r"[\W_]+")
+# Parsed names are memoized; a scan sees the same names again (mirrored roots, watch passes).
+NAME_CACHE_SIZE = 1 << 17
 ROMAN = {"i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x", "xi", "xii", "xiii", "xiv", "xv"}
+ROMAN_VALUES = {
+    "i": 1, "ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7, "viii": 8,
+    "ix": 9, "x": 10, "xi": 11, "xii": 12, "xiii": 13, "xiv": 14, "xv": 15,
+}
 SEPARATORS = [":", " - ", " – ", " — "]
 NUM_WORDS = {
     "zero": 0,
@@ -77,6 +145,8 @@ NUM_WORDS = {
 }
 
 # Manual collections for franchises that don't have clean TMDB collections.
+# Patterns are case-insensitive substrings; prefix with "word:" to match whole words only or
+# with "re:" for a regular expression (see CuratedMatcher).
 CURATED_COLLECTIONS: Dict[str, List[str]] = {
     "Anchorman Collection": ["Anchorman"],
     "Joe Dirt Collection": ["Joe Dirt"],
@@ -116,17 +186,10 @@ def words_to_number(words: List[str]) -> Optional[int]:
     return total + current if found else None
 
 
-def normalize_base(title: str) -> str:
-    """Normalize a title for grouping (strip year, subtitles, and trailing numerals)."""
-    t = YEAR_RE.sub("", title)
-    for sep in SEPARATORS:
-        if sep in t:
-            t = t.split(sep)[0]
-            break
-    t = t.replace("&", "and")
-    tokens = re.split(r"[\\s._-]+", t.lower())
-
-    # Convert leading number words to digits.
+def _numberize(tokens: List[str]) -> List[str]:
+    """Collapse runs of number words into digits ("one hundred and one" stays split on "and")."""
+    if NUM_WORDS.keys().isdisjoint(tokens):
+        return tokens
     out: List[str] = []
     i = 0
     while i < len(tokens):
@@ -143,149 +206,1241 @@ def normalize_base(title: str) -> str:
                 continue
         out.append(tokens[i])
         i += 1
+    return out
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def normalize_base(title: str) -> str:
+    """Normalize a title for grouping (strip year, subtitles, and trailing numerals)."""
+    t = YEAR_RE.sub("", title)
+    for sep in SEPARATORS:
+        if sep in t:
+            t = t.split(sep)[0]
+            break
+    t = t.replace("&", "and")
+    tokens = [tok for tok in BASE_SPLIT_RE.split(t.lower()) if tok]
+
+    # Convert number words to digits.
+    out = _numberize(tokens)
 
     while out and (out[-1].isdigit() or out[-1] in ROMAN):
         out.pop()
     return " ".join(out).strip()
 
 
+def canonical_key(title: str, year: Optional[int]) -> str:
+    """
+    Resolution key for a (title, year) pair, used to collapse duplicates before any lookup.
+
+    Unlike normalize_base() this keeps subtitles and sequel numbers: case, punctuation,
+    apostrophes, "&" and number words are normalized, and a trailing roman numeral becomes a
+    digit, so "Spider-Man: Far From Home", "spider man far from home" and "Rocky II"/"Rocky 2"
+    collapse while "Home Alone" and "Home Alone 2" stay separate.
+    """
+    return f"{canonical_title(title)}|{year or ''}"
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def canonical_title(title: str) -> str:
+    """The title half of canonical_key(): normalized, space-separated tokens."""
+    t = YEAR_RE.sub("", title).lower().replace("&", " and ")
+    t = t.replace("'", "").replace("\u2019", "")
+    tokens = _numberize([tok for tok in CANON_SPLIT_RE.split(t) if tok])
+    if len(tokens) > 1 and tokens[-1] in ROMAN:
+        tokens[-1] = str(ROMAN_VALUES[tokens[-1]])
+    return " ".join(tokens)
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def title_similarity(a: str, b: str) -> float:
+    """
+    Trigram Jaccard similarity of two canonical titles, or 0.0 when their numbers differ.
+
+    Requiring identical digit tokens keeps near-identical sequels ("toy story 2" vs
+    "toy story 3") and remakes with a year in the title from ever matching.
+    """
+    if a == b:
+        return 1.0
+    if {tok for tok in a.split() if tok.isdigit()} != {tok for tok in b.split() if tok.isdigit()}:
+        return 0.0
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def parse_title_year(name: str) -> Tuple[str, Optional[int]]:
     base = name
     year = None
     m = YEAR_RE.search(name)
     if m:
         year = int(m.group(1))
-        base = YEAR_RE.sub("", name).strip()
+        base = name[:m.start()]
     # Strip common quality/codec/resolution tokens tacked onto folder names.
-    base = re.sub(r"\b(480p|720p|1080p|2160p|4k|x264|x265|h264|h265|bluray|webrip|web-dl|hdr|hevc|aac|dts|ac3)\b",
-                  "", base, flags=re.IGNORECASE)
-    base = re.sub(r"\s+", " ", base).strip()
+    base = QUALITY_RE.sub("", base)
+    base = SPACES_RE.sub(" ", base).strip()
     return base, year
 
 
-def walk_media(paths: Iterable[str]) -> List[MediaItem]:
-    exts = {".mkv", ".mp4", ".avi", ".mov", ".m4v"}
-    found: List[MediaItem] = []
-    for root in paths:
-        p = Path(root)
-        if not p.exists():
+@dataclass(frozen=True)
+class ParsedTitle:
+    title: str
+    year: Optional[int]
+    base: str
+    sequel: Optional[int]
+
+
+def sequel_number(title: str) -> Optional[int]:
+    """Trailing sequel number ("Toy Story 3" -> 3, "Rocky II" -> 2), ignoring years like "2049"."""
+    tokens = canonical_title(title).split()
+    if len(tokens) > 1 and tokens[-1].isdigit() and int(tokens[-1]) < 100:
+        return int(tokens[-1])
+    return None
+
+
+def parse_titles(names: Iterable[str]) -> List[ParsedTitle]:
+    """
+    Parse a whole scan's worth of folder/file names in one batch.
+
+    Each distinct name is parsed once (duplicates across roots and repeated extras folders
+    share the work) with the precompiled patterns above; results come back in input order
+    with the title, year, normalize_base() grouping key and sequel number.
+    """
+    parsed: Dict[str, ParsedTitle] = {}
+    out: List[ParsedTitle] = []
+    for name in names:
+        hit = parsed.get(name)
+        if hit is None:
+            title, year = parse_title_year(name)
+            hit = parsed[name] = ParsedTitle(title, year, normalize_base(title), sequel_number(title))
+        out.append(hit)
+    return out
+
+
+@dataclass
+class ScanResult:
+    items: List[MediaItem]
+    added: List[MediaItem]
+    removed: List[MediaItem]
+    dirs_listed: int = 0
+    dirs_reused: int = 0
+    dirs: List[str] = field(default_factory=list)
+
+
+def _scan_dir(path: str, is_root: bool = False) -> Tuple[List[str], List[list]]:
+    """
+    List one directory with os.scandir and classify it.
+
+    Returns the subdirectories still to visit and the [title, year, path] items the directory
+    contributes. Child folders named "Title (Year)" are leaves and are emitted straight from the
+    parent listing without being opened. A folder without a year is a movie folder, yielding one
+    item for itself, only if it holds a single main feature named like the folder and nothing
+    else but extras and subtitle folders. Otherwise, e.g. "Comedies/" or "Marvel/" holding
+    movies and movie folders, every child folder and video file counts on its own. Extras
+    (Plex-style "-trailer"/"sample" files, "Featurettes/" and the like) are skipped once a
+    folder below a root has a main feature. Symlinked folders are listed but never followed, like rglob().
+    """
+    subdirs: List[str] = []
+    extras: List[str] = []
+    items: List[list] = []
+    features: List[list] = []
+    dirs: List[os.DirEntry] = []
+    videos: List[Tuple[str, os.DirEntry]] = []
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for entry in entries:
+        if entry.name.startswith("."):
             continue
-        for entry in p.rglob("*"):
-            if entry.name.startswith("."):
+        if entry.is_dir():
+            dirs.append(entry)
+        elif entry.is_file():
+            stem, ext = os.path.splitext(entry.name)
+            if ext.lower() in VIDEO_EXTS and not EXTRA_RE.search(stem):
+                videos.append((stem, entry))
+    # Only title and year are needed here (parse_titles' grouping keys are for the match stage);
+    # parse_title_year is memoized, so names repeated across roots and passes are parsed once.
+    parsed = [parse_title_year(name) for name in
+              [e.name for e in dirs] + [stem for stem, _ in videos] + [os.path.basename(path)]]
+    for entry, (title, year) in zip(dirs, parsed):
+        if year is not None:
+            items.append([title, year, entry.path])
+        elif entry.is_symlink():
+            continue
+        elif entry.name.lower() in EXTRA_DIRS:
+            extras.append(entry.path)
+        else:
+            subdirs.append(entry.path)
+    for (_, entry), (title, year) in zip(videos, parsed[len(dirs):]):
+        features.append([title, year, entry.path])
+    if not features or is_root:
+        return subdirs + extras, items + features
+    if len(features) == 1 and not items and not subdirs:
+        own_title, own_year = parsed[-1]
+        file_title, file_year = features[0][:2]
+        # "Anchorman/Anchorman (2004).mkv" is a movie folder; "Comedies/Anchorman (2004).mkv" is not
+        if title_similarity(canonical_title(own_title), canonical_title(file_title)) >= FUZZY_THRESHOLD:
+            return [], [[own_title, own_year if own_year is not None else file_year, path]]
+    return subdirs, items + features
+
+
+def _walk_tree(root: str, prev: Optional[Dict[str, dict]]) -> Tuple[Dict[str, dict], int, int]:
+    """
+    Depth-first walk of one root, returning {dir: node} in visit order plus listed/reused counts.
+
+    With a previous manifest (`prev`), a directory whose mtime/inode/size is unchanged reuses its
+    recorded node instead of being listed again. A directory's own stat changes whenever a direct
+    child is added, removed or renamed, so only its subdirectories still need a stat().
+    """
+    nodes: Dict[str, dict] = {}
+    listed = reused = 0
+    stack = [(root, True)]
+    while stack:
+        d, is_root = stack.pop()
+        sig = None
+        if prev is not None:
+            try:
+                st = os.stat(d)
+            except OSError:
+                continue
+            sig = [st.st_mtime_ns, st.st_ino, st.st_size]
+        node = prev.get(d) if prev else None
+        if node is None or node.get("stat") != sig:
+            try:
+                subdirs, items = _scan_dir(d, is_root)
+            except OSError:
                 continue
-            if entry.is_dir():
-                title, year = parse_title_year(entry.name)
-                found.append(MediaItem(title=title, year=year, path=entry))
-            elif entry.is_file() and entry.suffix.lower() in exts:
-                title, year = parse_title_year(entry.stem)
-                found.append(MediaItem(title=title, year=year, path=entry))
-    return found
+            node = {"stat": sig, "subdirs": subdirs, "items": items}
+            listed += 1
+        else:
+            reused += 1
+        nodes[d] = node
+        stack.extend((sub, False) for sub in reversed(node["subdirs"]))
+    return nodes, listed, reused
+
+
+def _scan_roots(paths: Iterable[str], prev: Optional[Dict[str, dict]]) -> Tuple[Dict[str, dict], int, int]:
+    # Keep roots as given so cache keys match between scan modes; one worker per root, since
+    # each root is usually its own mount and they don't contend with each other.
+    roots = [str(Path(root)) for root in paths if os.path.isdir(root)]
+    nodes: Dict[str, dict] = {}
+    listed = reused = 0
+    if not roots:
+        return nodes, listed, reused
+    with ThreadPoolExecutor(max_workers=len(roots)) as pool:
+        for tree, n_listed, n_reused in pool.map(lambda root: _walk_tree(root, prev), roots):
+            nodes.update(tree)
+            listed += n_listed
+            reused += n_reused
+    return nodes, listed, reused
+
+
+def _to_item(raw: list) -> MediaItem:
+    return MediaItem(title=raw[0], year=raw[1], path=Path(raw[2]))
+
+
+def walk_media(paths: Iterable[str]) -> List[MediaItem]:
+    """Scan every root in parallel and return one MediaItem per movie folder or loose video file."""
+    nodes, _, _ = _scan_roots(paths, None)
+    return [_to_item(raw) for node in nodes.values() for raw in node["items"]]
+
+
+def _load_manifest(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("dirs", {})
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    """Write via a temp file in the same directory and rename, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _save_manifest(path: Path, dirs: Dict[str, dict]) -> None:
+    _atomic_write(path, json.dumps({"version": MANIFEST_VERSION, "dirs": dirs}, sort_keys=True))
+
+
+def walk_media_incremental(paths: Iterable[str], manifest_path: Path) -> ScanResult:
+    """
+    Scan like walk_media(), but only list directories whose mtime/inode/size changed.
+
+    The result carries the full inventory plus what was added/removed since the last scan.
+    """
+    prev = _load_manifest(manifest_path)
+    current, listed, reused = _scan_roots(paths, prev)
+
+    items = [_to_item(raw) for node in current.values() for raw in node["items"]]
+    now_paths = {raw[2] for node in current.values() for raw in node["items"]}
+    prev_paths = {raw[2] for node in prev.values() for raw in node["items"]}
+    added = [item for item in items if str(item.path) not in prev_paths]
+    removed = [_to_item(raw) for node in prev.values() for raw in node["items"] if raw[2] not in now_paths]
+    _save_manifest(manifest_path, current)
+    return ScanResult(
+        items=items, added=added, removed=removed, dirs_listed=listed, dirs_reused=reused, dirs=list(current)
+    )
+
 
+class TMDBError(RuntimeError):
+    """Raised when TMDB keeps failing after retries or returns a non-retryable status."""
 
-def tmdb_get(url: str) -> dict:
-    with urllib.request.urlopen(url) as resp:
-        return json.load(resp)
 
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `capacity`."""
 
-def search_tmdb(api_key: str, title: str, year: Optional[int]) -> Optional[int]:
-    query = urllib.parse.quote(title)
-    year_param = f"&year={year}" if year else ""
-    url = f"https://api.themoviedb.org/3/search/movie?api_key={api_key}&query={query}{year_param}"
-    data = tmdb_get(url)
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available, without waiting."""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class TMDBClient:
+    """
+    Minimal TMDB v3 client shared by the resolver threads.
+
+    Each thread keeps its own keep-alive connection; all threads share one token bucket so the
+    aggregate request rate stays under TMDB's limit. `base_url` can point at a local stand-in
+    server (plain http is fine) for testing.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = TMDB_API,
+        rate: float = DEFAULT_RATE,
+        retries: int = 5,
+        timeout: float = 30.0,
+    ) -> None:
+        parsed = urllib.parse.urlsplit(base_url)
+        self.api_key = api_key
+        self.scheme = parsed.scheme or "https"
+        self.netloc = parsed.netloc
+        self.prefix = parsed.path.rstrip("/")
+        self.retries = retries
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate)
+        self.calls = 0
+        self.retried = 0
+        self._local = threading.local()
+        self._conns: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = cls(self.netloc, timeout=self.timeout)
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> None:
+        delay = min(30.0, 0.5 * (2 ** attempt)) + random.uniform(0, 0.25)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        with self._lock:
+            self.retried += 1
+        time.sleep(delay)
+
+    def get(self, path: str, **params) -> dict:
+        query = urllib.parse.urlencode({"api_key": self.api_key, **params})
+        target = f"{self.prefix}{path}?{query}"
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            conn = self._connection()
+            try:
+                conn.request("GET", target, headers={"Accept": "application/json"})
+                resp = conn.getresponse()
+                body = resp.read()
+            except (http.client.HTTPException, OSError) as exc:
+                # Stale keep-alive socket or network blip: reconnect and try again.
+                conn.close()
+                if attempt == self.retries:
+                    raise TMDBError(f"GET {path} failed: {exc}") from exc
+                self._backoff(attempt)
+                continue
+            with self._lock:
+                self.calls += 1
+            if resp.status == 200:
+                return json.loads(body)
+            if resp.status in RETRY_STATUSES and attempt < self.retries:
+                self._backoff(attempt, resp.getheader("Retry-After"))
+                continue
+            raise TMDBError(f"GET {path}: HTTP {resp.status}")
+        raise TMDBError(f"GET {path}: retries exhausted")
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+
+
+def search_tmdb(client: TMDBClient, title: str, year: Optional[int]) -> Optional[int]:
+    params = {"query": title}
+    if year:
+        params["year"] = year
+    data = client.get("/search/movie", **params)
     results = data.get("results") or []
     if not results:
         return None
     return results[0]["id"]
 
 
-def tmdb_movie_details(api_key: str, movie_id: int) -> dict:
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={api_key}"
-    return tmdb_get(url)
+def tmdb_movie_details(client: TMDBClient, movie_id: int) -> dict:
+    return client.get(f"/movie/{movie_id}")
 
 
-def load_cache(path: Path) -> dict:
-    if path.exists():
-        return json.loads(path.read_text(encoding="utf-8"))
-    return {}
+def tmdb_collection(client: TMDBClient, collection_id: int) -> dict:
+    return client.get(f"/collection/{collection_id}")
 
 
-def save_cache(path: Path, data: dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+@dataclass
+class ResolveStats:
+    items: int = 0
+    jobs: int = 0
+    cache_hits: int = 0
+    resolved: int = 0
+    collections_fetched: int = 0
+    details_avoided: int = 0
+    fuzzy_hits: int = 0
+    fuzzy_misses: int = 0
 
 
-def build_collections(api_key: str, items: List[MediaItem], cache_path: Path) -> Tuple[Dict[str, List[str]], dict]:
-    cache = load_cache(cache_path)
-    # cache schema: { "title|year|path": { "tmdb_id": int, "collection_id": int|null, "collection_name": str|null } }
-    def cache_key(item: MediaItem) -> str:
-        return f"{item.title}|{item.year or ''}|{item.path}"
+@dataclass
+class Resolution:
+    tmdb_id: Optional[int]
+    title: Optional[str]
+    collection: Optional[dict]
 
-    collections: Dict[str, List[str]] = defaultdict(list)
 
-    for item in items:
-        key = cache_key(item)
-        entry = cache.get(key)
-        tmdb_id = None
+class TMDBCache:
+    """
+    Indexed on-disk resolution cache (SQLite).
+
+    Rows hold the TMDB id, canonical title and collection for one cache key, each with its own
+    expiry; a second table keeps the parts list of every collection fetched by the prefetcher.
+    Writes are committed in small batches while the run progresses, so an interrupted run keeps
+    everything resolved so far. A legacy JSON cache next to the database is imported once.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS resolutions (
+            key TEXT PRIMARY KEY,
+            tmdb_id INTEGER,
+            title TEXT,
+            collection_id INTEGER,
+            collection_name TEXT,
+            expires_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS collections (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            parts TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_days: float = DEFAULT_TTL_DAYS,
+        miss_ttl_days: float = MISS_TTL_DAYS,
+        commit_every: int = 50,
+    ) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        legacy = path.with_suffix(".json")
+        if path.suffix.lower() == ".json" or not self._is_sqlite(path):
+            # An old `--cache .../tmdb_cache.json`: keep the JSON, import it into a sibling database.
+            legacy = path
+            path = path.with_suffix(".sqlite")
+            if path == legacy:
+                path = legacy.with_name(legacy.name + "3")
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.miss_ttl = miss_ttl_days * 86400
+        self.commit_every = commit_every
+        self._pending = 0
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+        self._import_legacy_json(legacy)
+
+    @staticmethod
+    def _is_sqlite(path: Path) -> bool:
+        """True for SQLite databases and for files SQLite can create (missing or empty)."""
+        try:
+            with path.open("rb") as fh:
+                header = fh.read(16)
+        except FileNotFoundError:
+            return True
+        return not header or header == b"SQLite format 3\x00"
+
+    def _import_legacy_json(self, legacy: Path) -> None:
+        if not legacy.exists() or len(self):
+            return
+        try:
+            data = json.loads(legacy.read_text(encoding="utf-8"))
+        except (ValueError, UnicodeDecodeError) as exc:
+            print(f"Ignoring unreadable legacy cache {legacy}: {exc}", file=sys.stderr)
+            return
+        expires = time.time() + self.ttl
+        rows = []
+        for old_key, entry in data.items():
+            # Old keys are "title|year|path"; rows are keyed by canonical (title, year).
+            title, year = (old_key.split("|") + ["", ""])[:2]
+            key = canonical_key(title, int(year) if year.isdigit() else None)
+            coll = entry.get("collection") or {}
+            # No canonical title in the old format: the next run refetches details once.
+            rows.append((key, entry.get("tmdb_id"), None, coll.get("id"), coll.get("name"), expires))
+        self.conn.executemany("INSERT OR IGNORE INTO resolutions VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def get(self, key: str, include_stale: bool = False) -> Optional[Resolution]:
+        row = self.conn.execute(
+            "SELECT tmdb_id, title, collection_id, collection_name, expires_at FROM resolutions WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        tmdb_id, title, coll_id, coll_name, expires_at = row
+        # Stale hits are reused for unchanged paths, but misses always expire so unknown titles
+        # are searched again after MISS_TTL_DAYS.
+        if expires_at < time.time() and not (include_stale and tmdb_id):
+            return None
+        collection = {"id": coll_id, "name": coll_name} if coll_name else None
+        return Resolution(tmdb_id=tmdb_id, title=title, collection=collection)
+
+    def put(self, key: str, res: Resolution) -> None:
+        ttl = self.ttl if res.tmdb_id else self.miss_ttl
+        coll = res.collection or {}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?, ?, ?)",
+            (key, res.tmdb_id, res.title, coll.get("id"), coll.get("name"), time.time() + ttl),
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.flush()
+
+    def resolved(self) -> List[Tuple[str, Resolution]]:
+        """Fresh rows that resolved to a TMDB id, as (key, Resolution)."""
+        rows = self.conn.execute(
+            "SELECT key, tmdb_id, title, collection_id, collection_name FROM resolutions "
+            "WHERE tmdb_id IS NOT NULL AND title IS NOT NULL AND expires_at >= ?",
+            (time.time(),),
+        ).fetchall()
+        return [
+            (key, Resolution(tmdb_id, title, {"id": coll_id, "name": coll_name} if coll_name else None))
+            for key, tmdb_id, title, coll_id, coll_name in rows
+        ]
+
+    def collections(self) -> List[Tuple[int, str, List[list]]]:
+        """Fresh (collection_id, name, [[movie_id, title], ...]) rows."""
+        rows = self.conn.execute(
+            "SELECT id, name, parts FROM collections WHERE expires_at >= ?", (time.time(),)
+        ).fetchall()
+        return [(coll_id, name, json.loads(parts)) for coll_id, name, parts in rows]
+
+    def export_membership(self, path: Path) -> int:
+        """Write cached collection parts as an OfflineIndex membership file (JSON lines)."""
+        count = 0
+        with path.open("w", encoding="utf-8") as fh:
+            for coll_id, name, parts in self.collections():
+                for movie_id, _title in parts:
+                    fh.write(json.dumps({"movie_id": movie_id, "collection_id": coll_id, "collection_name": name}) + "\n")
+                    count += 1
+        return count
+
+    def put_collection(self, coll_id: int, name: str, parts: List[list]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO collections VALUES (?, ?, ?, ?)",
+            (coll_id, name, json.dumps(parts), time.time() + self.ttl),
+        )
+        self._pending += 1
+
+    def flush(self) -> None:
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM resolutions").fetchone()[0]
+
+
+class OfflineIndex:
+    """
+    Title index built from TMDB's daily movie ID export, for resolving without network access.
+
+    The export (movie_ids_MM_DD_YYYY.json.gz, one JSON object per line) is streamed into SQLite in
+    batches, so ingesting the ~1M-row file never holds it in memory. Lookups go through an index on
+    the canonical title first, then through an FTS5 trigram index (when SQLite ships it) re-scored
+    with title_similarity(). The export has no release years or collections: ties go to the most
+    popular movie, and collections come from an optional membership file (JSON lines of
+    {"movie_id", "collection_id", "collection_name"}, e.g. from --export-membership).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS movies (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            norm TEXT NOT NULL,
+            popularity REAL NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS movies_norm ON movies (norm);
+        CREATE TABLE IF NOT EXISTS membership (
+            movie_id INTEGER PRIMARY KEY,
+            collection_id INTEGER NOT NULL,
+            collection_name TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: Path, threshold: float = FUZZY_THRESHOLD) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(self.SCHEMA)
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS titles_fts USING fts5("
+                "norm, content='movies', content_rowid='id', tokenize='trigram')"
+            )
+            # Per-trigram document counts, to pick the rarest grams of a query.
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS titles_vocab USING fts5vocab(titles_fts, 'row')")
+            self.fuzzy = True
+        except sqlite3.OperationalError:
+            # SQLite < 3.34 has no trigram tokenizer: exact matches only.
+            self.fuzzy = False
+        self.conn.commit()
+
+    @staticmethod
+    def _open(path: Path):
+        return gzip.open(path, "rt", encoding="utf-8") if path.suffix == ".gz" else path.open(encoding="utf-8")
+
+    def ingest_export(self, path: Path, batch: int = 20000) -> int:
+        rows: List[tuple] = []
+        count = 0
+        with self._open(path) as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                if rec.get("adult") or rec.get("video"):
+                    continue
+                title = rec.get("original_title") or rec.get("title")
+                if not title:
+                    continue
+                rows.append((rec["id"], title, canonical_title(title), rec.get("popularity") or 0))
+                if len(rows) >= batch:
+                    self.conn.executemany("INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?)", rows)
+                    count += len(rows)
+                    rows.clear()
+        self.conn.executemany("INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?)", rows)
+        count += len(rows)
+        if self.fuzzy:
+            self.conn.execute("INSERT INTO titles_fts(titles_fts) VALUES ('rebuild')")
+        self.conn.commit()
+        return count
+
+    def ingest_membership(self, path: Path) -> int:
+        rows = []
+        with self._open(path) as fh:
+            for line in fh:
+                if line.strip():
+                    rec = json.loads(line)
+                    rows.append((rec["movie_id"], rec["collection_id"], rec["collection_name"]))
+        self.conn.executemany("INSERT OR REPLACE INTO membership VALUES (?, ?, ?)", rows)
+        self.conn.commit()
+        return len(rows)
+
+    def _fuzzy_queries(self, norm: str) -> List[str]:
+        """
+        FTS5 MATCH expressions for titles that may reach the threshold, cheapest first.
+
+        Prefix filtering: a title with similarity >= t shares at least ceil(t * |A|) of the
+        query's |A| trigrams, so it contains at least one of the query's (n - k + 1) rarest
+        indexable grams, where n is the number of indexable grams and k is how many of them it
+        must share. ORing only those keeps common grams ("the", " a ") from dragging a large
+        share of the export into ranking. When k >= 2, titles holding two of the four rarest
+        grams come first: that is a few rows, and usually holds the answer.
+        """
+        every = trigrams(norm)
+        grams = sorted(g for g in every if g.strip() and len(g.strip()) == 3)
+        if not grams:
+            return []
+        # Padded edge grams aren't in the FTS index; they can account for some of the overlap.
+        must_share = math.ceil(self.threshold * len(every)) - (len(every) - len(grams))
+        if must_share <= 1:
+            return [" OR ".join(_fts_phrase(g) for g in grams)]
+        docs = dict(self.conn.execute(
+            f"SELECT term, doc FROM titles_vocab WHERE term IN ({','.join('?' * len(grams))})", grams
+        ).fetchall())
+        # A gram no title contains can't be shared; it still counts against the quota.
+        rarest = sorted(grams, key=lambda g: docs.get(g, 0))[:len(grams) - must_share + 1]
+        rarest = [g for g in rarest if docs.get(g)]
+        if not rarest:
+            return []
+        queries = [" OR ".join(_fts_phrase(g) for g in rarest)]
+        if len(rarest) >= 2:
+            pairs = itertools.combinations(rarest[:4], 2)
+            queries.insert(0, " OR ".join(f"({_fts_phrase(a)} AND {_fts_phrase(b)})" for a, b in pairs))
+        return queries
+
+    def _fuzzy_candidates(self, query: str) -> List[tuple]:
+        return self.conn.execute(
+            "SELECT m.id, m.norm, m.popularity FROM titles_fts f JOIN movies m ON m.id = f.rowid "
+            "WHERE titles_fts MATCH ? ORDER BY f.rank LIMIT 50",
+            (query,),
+        ).fetchall()
+
+    def _best_candidate(self, norm: str, candidates: Iterable[tuple]) -> Optional[int]:
+        best = None
+        for movie_id, cand, popularity in candidates:
+            score = title_similarity(norm, cand)
+            if score >= self.threshold and (best is None or (score, popularity) > best[:2]):
+                best = (score, popularity, movie_id)
+        return best[2] if best else None
+
+    def fuzzy_lookup(self, norm: str) -> Optional[int]:
+        for query in self._fuzzy_queries(norm):
+            movie_id = self._best_candidate(norm, self._fuzzy_candidates(query))
+            if movie_id is not None:
+                return movie_id
+        return None
+
+    def lookup(self, title: str) -> Optional[int]:
+        norm = canonical_title(title)
+        row = self.conn.execute(
+            "SELECT id FROM movies WHERE norm = ? ORDER BY popularity DESC LIMIT 1", (norm,)
+        ).fetchone()
+        if row:
+            return row[0]
+        if not self.fuzzy:
+            return None
+        return self.fuzzy_lookup(norm)
+
+    def resolve(self, item: MediaItem) -> Resolution:
+        movie_id = self.lookup(item.title)
         collection = None
+        if movie_id is not None:
+            row = self.conn.execute(
+                "SELECT collection_id, collection_name FROM membership WHERE movie_id = ?", (movie_id,)
+            ).fetchone()
+            if row:
+                collection = {"id": row[0], "name": row[1]}
+        # The export only has original-language titles; keep the library's title for Plex search.
+        return Resolution(tmdb_id=movie_id, title=item.title, collection=collection)
 
-        if entry:
-            tmdb_id = entry.get("tmdb_id")
-            collection = entry.get("collection")
-        if not tmdb_id:
-            tmdb_id = search_tmdb(api_key, item.title, item.year)
-        canonical_title = item.title
-        if tmdb_id:
-            details = tmdb_movie_details(api_key, tmdb_id)
-            if details.get("title"):
-                canonical_title = details["title"]
-            belongs = details.get("belongs_to_collection")
-            if belongs:
-                collection = {"id": belongs.get("id"), "name": belongs.get("name")}
-            cache[key] = {"tmdb_id": tmdb_id, "collection": collection}
-        else:
-            cache[key] = {"tmdb_id": None, "collection": None}
+    def close(self) -> None:
+        self.conn.close()
 
-        if collection and collection.get("name"):
-            collections[collection["name"]].append(canonical_title)
 
-    # Add curated manual collections
-    inventory_titles = {item.title for item in items}
-    for coll_name, patterns in CURATED_COLLECTIONS.items():
-        hits = []
-        for title in inventory_titles:
+class FuzzyTitleIndex:
+    """
+    In-memory trigram index over titles already resolved in the cache.
+
+    A cache miss whose canonical title is within `threshold` title_similarity() of a resolved
+    key (same year when both have one, same sequel numbers) reuses that resolution instead of
+    searching TMDB again, so "Spider Man - Into The Spiderverse" lands on the row stored for
+    "Spider-Man: Into the Spider-Verse". Candidates come from shared trigrams only, so a lookup
+    never scans the whole cache.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, Resolution]], threshold: float = FUZZY_CACHE_THRESHOLD) -> None:
+        self.threshold = threshold
+        self._entries: List[Tuple[str, str, Resolution]] = []
+        self._grams: List[set] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for key, res in sorted(rows, key=lambda row: row[0]):
+            title, _, year = key.rpartition("|")
+            grams = trigrams(title)
+            idx = len(self._entries)
+            self._entries.append((title, year, res))
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings[gram].append(idx)
+
+    def lookup(self, key: str) -> Optional[Resolution]:
+        title, _, year = key.rpartition("|")
+        grams = trigrams(title)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for idx in self._postings.get(gram, ()):
+                shared[idx] += 1
+        best: Optional[Tuple[float, int]] = None
+        for idx, count in shared.items():
+            cand_title, cand_year, _ = self._entries[idx]
+            if year and cand_year and year != cand_year:
+                continue
+            # Cheap upper bound from the shared count before the exact check.
+            if count / (len(grams) + len(self._grams[idx]) - count) < self.threshold:
+                continue
+            score = title_similarity(title, cand_title)
+            if score >= self.threshold and (best is None or score > best[0]):
+                best = (score, idx)
+        return self._entries[best[1]][2] if best else None
+
+
+class CollectionPrefetcher:
+    """
+    Fetches each TMDB collection's parts list once and answers later members from it.
+
+    When a movie's details reveal its collection, /collection/{id} is fetched (once per run, even
+    with several workers hitting the same franchise), but only if the movie's normalize_base() is
+    in `shared`, i.e. enough other pending titles look like the same franchise for the call to pay
+    off. Any other library item whose search lands on one of that collection's parts then takes
+    its title and collection from the parts list and skips its own /movie/{id} details call.
+    Collections already in the cache seed the index.
+    """
+
+    def __init__(
+        self,
+        client: TMDBClient,
+        known: Iterable[Tuple[int, str, List[list]]] = (),
+        shared: Optional[set] = None,
+    ) -> None:
+        self.client = client
+        self.shared = shared
+        self.collections_fetched = 0
+        self.details_avoided = 0
+        self._by_movie: Dict[int, Tuple[str, dict]] = {}
+        self._seen: set = set()
+        self._new: List[Tuple[int, str, List[list]]] = []
+        self._lock = threading.Lock()
+        for coll_id, name, parts in known:
+            self._index(coll_id, name, parts)
+
+    def _index(self, coll_id: int, name: str, parts: List[list]) -> None:
+        self._seen.add(coll_id)
+        for movie_id, title in parts:
+            self._by_movie[movie_id] = (title, {"id": coll_id, "name": name})
+
+    def lookup(self, movie_id: int) -> Optional[Tuple[str, dict]]:
+        with self._lock:
+            hit = self._by_movie.get(movie_id)
+            if hit:
+                self.details_avoided += 1
+            return hit
+
+    def prefetch(self, coll_id: Optional[int], title: str = "") -> None:
+        if coll_id is None:
+            return
+        if self.shared is not None and normalize_base(title) not in self.shared:
+            return
+        with self._lock:
+            if coll_id in self._seen:
+                return
+            self._seen.add(coll_id)
+        try:
+            data = tmdb_collection(self.client, coll_id)
+        except TMDBError as exc:
+            # Only an optimisation: its members just fall back to their own details calls.
+            print(f"Collection prefetch skipped: {exc}", file=sys.stderr)
+            return
+        parts = [[part["id"], part.get("title")] for part in data.get("parts") or [] if part.get("title")]
+        with self._lock:
+            self.collections_fetched += 1
+            self._index(coll_id, data.get("name") or "", parts)
+            self._new.append((coll_id, data.get("name") or "", parts))
+
+    def drain_new(self) -> List[Tuple[int, str, List[list]]]:
+        """Collections fetched since the last call, for the main thread to persist."""
+        with self._lock:
+            new, self._new = self._new, []
+        return new
+
+
+def resolve_item(
+    client: TMDBClient,
+    item: MediaItem,
+    cached: Optional[Resolution],
+    prefetcher: Optional[CollectionPrefetcher] = None,
+) -> Resolution:
+    """Resolve one item to its TMDB id, canonical title and collection (network bound)."""
+    tmdb_id = cached.tmdb_id if cached else None
+    collection = cached.collection if cached else None
+    if not tmdb_id:
+        tmdb_id = search_tmdb(client, item.title, item.year)
+    canonical_title = item.title
+    if tmdb_id:
+        hit = prefetcher.lookup(tmdb_id) if prefetcher else None
+        if hit:
+            canonical_title, collection = hit
+            return Resolution(tmdb_id=tmdb_id, title=canonical_title, collection=dict(collection))
+        details = tmdb_movie_details(client, tmdb_id)
+        if details.get("title"):
+            canonical_title = details["title"]
+        belongs = details.get("belongs_to_collection")
+        collection = {"id": belongs.get("id"), "name": belongs.get("name")} if belongs else None
+        if collection and prefetcher:
+            prefetcher.prefetch(collection["id"], item.title)
+    return Resolution(tmdb_id=tmdb_id, title=canonical_title, collection=collection)
+
+
+class CuratedMatcher:
+    """
+    Precompiled matcher for CURATED_COLLECTIONS, built once per run.
+
+    Plain and "word:" patterns go into one Aho-Corasick automaton over the lowercased text, so
+    matching a title is linear in its length no matter how many patterns there are; "word:" hits
+    are kept only when both ends fall on a word boundary. Each "re:" pattern is compiled once
+    (case-insensitive) and searched on its own, so overlapping regexes all report their
+    collections; those whose collection has already matched are skipped.
+    """
+
+    def __init__(self, collections: Dict[str, List[str]]) -> None:
+        self.names = list(collections)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (collection index, pattern length, whole-word) for every pattern ending there.
+        self._out: List[List[Tuple[int, int, bool]]] = [[]]
+        self._regexes: List[Tuple[int, re.Pattern]] = []
+        for ci, patterns in enumerate(collections.values()):
             for pat in patterns:
-                if pat.lower() in title.lower():
-                    hits.append(title)
-                    break
-        if len(hits) >= 2:
-            collections[coll_name].extend(sorted(set(hits)))
+                if pat.startswith("re:"):
+                    self._regexes.append((ci, re.compile(pat[3:], re.IGNORECASE)))
+                elif pat.startswith("word:"):
+                    self._add(pat[5:].lower(), ci, True)
+                elif pat:
+                    self._add(pat.lower(), ci, False)
+        self._build_links()
+
+    def _add(self, pattern: str, ci: int, word: bool) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].append((ci, len(pattern), word))
+
+    def _build_links(self) -> None:
+        # Breadth-first; depth-1 states keep the root as their failure link.
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def match(self, title: str) -> List[str]:
+        """Names of every curated collection with at least one pattern found in `title`."""
+        text = title.lower()
+        found: set = set()
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for ci, length, word in self._out[state]:
+                if word:
+                    start, end = i - length + 1, i + 1
+                    if (start > 0 and text[start - 1].isalnum()) or (end < len(text) and text[end].isalnum()):
+                        continue
+                found.add(ci)
+        for ci, regex in self._regexes:
+            if ci not in found and regex.search(title):
+                found.add(ci)
+        return [self.names[ci] for ci in sorted(found)]
+
+
+def build_collections(
+    client: TMDBClient,
+    items: List[MediaItem],
+    cache: TMDBCache,
+    workers: int = DEFAULT_WORKERS,
+    known_paths: Optional[set] = None,
+    stats: Optional[ResolveStats] = None,
+    prefetch: bool = True,
+    offline: Optional[OfflineIndex] = None,
+    matcher: Optional[CuratedMatcher] = None,
+    fuzzy_threshold: float = FUZZY_CACHE_THRESHOLD,
+) -> Tuple[Dict[str, List[str]], TMDBCache]:
+    """
+    Resolve items and group them into collections.
+
+    Items are first grouped by canonical_key(), so a title present as both folder and file, or
+    mirrored across roots, is one resolution job whose result fans back out to every path.
+    `known_paths` (from an incremental scan) marks items seen unchanged in the previous run: their
+    prior cache rows are reused even past their TTL, so only added items reach the resolver.
+    With `prefetch`, franchise members are resolved from a shared collection parts list (see
+    CollectionPrefetcher) instead of one details call each: pending titles are grouped by
+    parse_titles()' normalize_base() key, and the rest of a big enough group is only submitted
+    once its first title has resolved, so they find the parts list already fetched. With `offline`, anything the cache
+    can't answer is resolved from the local export index and `client` is never used. Otherwise
+    cache misses first try a FuzzyTitleIndex over resolved rows (`fuzzy_threshold` 0 disables it),
+    and only genuinely new titles are searched on TMDB.
+    """
+    known_paths = known_paths or set()
+    stats = stats if stats is not None else ResolveStats()
+
+    collections: Dict[str, List[str]] = defaultdict(list)
+
+    jobs: Dict[str, List[int]] = {}
+    for i, item in enumerate(items):
+        jobs.setdefault(canonical_key(item.title, item.year), []).append(i)
+    keys = list(jobs)
+    # The first item (in scan order) is the one whose title is sent to TMDB.
+    reps = [items[jobs[key][0]] for key in keys]
+    results: List[Optional[Resolution]] = [
+        cache.get(key, include_stale=any(str(items[i].path) in known_paths for i in jobs[key])) for key in keys
+    ]
+    # Complete, fresh entries (title known) need no network at all; partial ones skip the search.
+    pending = [j for j, res in enumerate(results) if res is None or res.title is None]
+    stats.items += len(items)
+    stats.jobs += len(keys)
+    stats.cache_hits += len(keys) - len(pending)
+    if offline is not None:
+        # Local index lookups are cheap and not cached: TMDB-backed rows stay authoritative.
+        for j in pending:
+            results[j] = offline.resolve(reps[j])
+        stats.resolved += len(pending)
+        pending = []
+    misses = [j for j in pending if results[j] is None]
+    if fuzzy_threshold > 0 and misses:
+        fuzzy = FuzzyTitleIndex(cache.resolved(), threshold=fuzzy_threshold)
+        for j in misses:
+            hit = fuzzy.lookup(keys[j])
+            if hit is None:
+                stats.fuzzy_misses += 1
+                continue
+            stats.fuzzy_hits += 1
+            results[j] = Resolution(hit.tmdb_id, hit.title, dict(hit.collection) if hit.collection else None)
+            cache.put(keys[j], results[j])
+        pending = [j for j in pending if results[j] is None or results[j].title is None]
+    prefetcher = None
+    leaders = pending
+    followers: Dict[int, List[int]] = defaultdict(list)
+    if prefetch and pending:
+        parsed = parse_titles(reps[j].title for j in pending)
+        sizes: Dict[str, int] = defaultdict(int)
+        for p in parsed:
+            sizes[p.base] += 1
+        shared = {base for base, n in sizes.items() if n >= PREFETCH_MIN_GROUP}
+        prefetcher = CollectionPrefetcher(client, cache.collections(), shared=shared)
+        leaders = []
+        leader_of: Dict[str, int] = {}
+        for j, p in zip(pending, parsed):
+            if p.base in leader_of:
+                followers[leader_of[p.base]].append(j)
+            else:
+                leaders.append(j)
+                if p.base in shared:
+                    leader_of[p.base] = j
+
+    def submit(pool: ThreadPoolExecutor, j: int):
+        return pool.submit(resolve_item, client, reps[j], results[j], prefetcher)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {submit(pool, j): j for j in leaders}
+            try:
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        j = futures.pop(fut)
+                        results[j] = fut.result()
+                        cache.put(keys[j], results[j])
+                        stats.resolved += 1
+                        for follower in followers.pop(j, ()):
+                            futures[submit(pool, follower)] = follower
+                    for coll in prefetcher.drain_new() if prefetcher else ():
+                        cache.put_collection(*coll)
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
+    finally:
+        if prefetcher:
+            for coll in prefetcher.drain_new():
+                cache.put_collection(*coll)
+            stats.collections_fetched += prefetcher.collections_fetched
+            stats.details_avoided += prefetcher.details_avoided
+        cache.flush()
+
+    # Assemble in input order so the output doesn't depend on completion order.
+    for key, res in zip(keys, results):
+        if res.collection and res.collection.get("name"):
+            for i in jobs[key]:
+                collections[res.collection["name"]].append(res.title or items[i].title)
+
+    # Add curated manual collections
+    matcher = matcher or CuratedMatcher(CURATED_COLLECTIONS)
+    hits: Dict[str, set] = defaultdict(set)
+    for title in {item.title for item in items}:
+        for coll_name in matcher.match(title):
+            hits[coll_name].add(title)
+    for coll_name in matcher.names:
+        if len(hits[coll_name]) >= 2:
+            collections[coll_name].extend(sorted(hits[coll_name]))
 
-    save_cache(cache_path, cache)
     return collections, cache
 
 
-def write_yaml(out_path: Path, holiday_block: str, collections: Dict[str, List[str]], min_items: int = 2) -> None:
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    lines: List[str] = []
-    lines.append("collections:")
+@dataclass
+class YamlChangelog:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    written: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.written)
+
+
+def _collection_block(name: str, titles: List[str]) -> List[str]:
+    lines = [
+        f"  {name}:",
+        "    visible_library: true",
+        "    collection_order: release",
+        f"    sort_title: \"{name}\"",
+        "    plex_search:",
+        "      any:",
+        "        title:",
+    ]
+    lines.extend(f"          - \"{title}\"" for title in titles)
+    return lines
+
+
+def _split_filename(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") + ".yml"
+
+
+def write_yaml(
+    out_path: Path,
+    holiday_block: str,
+    collections: Dict[str, List[str]],
+    min_items: int = 2,
+    split_dir: Optional[Path] = None,
+    changelog_path: Optional[Path] = None,
+) -> YamlChangelog:
+    """
+    Write the collections YAML only where its content changed.
+
+    Each collection block is hashed and compared with the hashes recorded next to `out_path`
+    (<out>.state.json) to work out which collections were added, removed or changed. Files are
+    replaced atomically and left untouched (mtime included) when their bytes are identical, so
+    Kometa isn't retriggered for nothing. `split_dir` additionally keeps one file per collection,
+    and `changelog_path` receives the diff as JSON for downstream runs.
+    """
+    blocks: Dict[str, List[str]] = {}
     # Holiday block already includes indentation relative to collections root
-    for l in holiday_block.strip().splitlines():
-        lines.append(f"  {l}")
+    holiday_lines = [f"  {l}" for l in holiday_block.strip().splitlines()]
+    if holiday_lines:
+        blocks[holiday_lines[0].strip().rstrip(":")] = holiday_lines
     for name in sorted(collections.keys(), key=lambda x: x.lower()):
         titles = sorted(set(collections[name]))
         if len(titles) < min_items:
             continue
-        lines.append(f"  {name}:")
-        lines.append("    visible_library: true")
-        lines.append("    collection_order: release")
-        lines.append(f"    sort_title: \"{name}\"")
-        lines.append("    plex_search:")
-        lines.append("      any:")
-        lines.append("        title:")
-        for title in titles:
-            lines.append(f"          - \"{title}\"")
-        lines.append("")
-    out_path.write_text("\n".join(lines).rstrip() + "\n", encoding="utf-8")
+        blocks[name] = _collection_block(name, titles)
+
+    hashes = {
+        name: hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest() for name, lines in blocks.items()
+    }
+    state_path = out_path.with_name(out_path.name + ".state.json")
+    try:
+        previous = json.loads(state_path.read_text(encoding="utf-8")).get("collections", {})
+    except (OSError, ValueError):
+        previous = {}
+    log = YamlChangelog(
+        added=[name for name in hashes if name not in previous],
+        removed=sorted(name for name in previous if name not in hashes),
+        changed=[name for name in hashes if name in previous and previous[name] != hashes[name]],
+    )
+
+    lines: List[str] = ["collections:"]
+    for name, block in blocks.items():
+        lines.extend(block)
+        if name in collections:
+            lines.append("")
+    text = "\n".join(lines).rstrip() + "\n"
+    if not out_path.exists() or out_path.read_text(encoding="utf-8") != text:
+        _atomic_write(out_path, text)
+        log.written = True
+
+    if split_dir is not None:
+        for name, block in blocks.items():
+            path = split_dir / _split_filename(name)
+            if name in log.added or name in log.changed or not path.exists():
+                _atomic_write(path, "\n".join(["collections:"] + block) + "\n")
+        for name in log.removed:
+            (split_dir / _split_filename(name)).unlink(missing_ok=True)
+
+    if previous != hashes:
+        _atomic_write(state_path, json.dumps({"collections": hashes}, indent=2, sort_keys=True) + "\n")
+    if changelog_path is not None:
+        _atomic_write(changelog_path, json.dumps({
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "added": log.added,
+            "removed": log.removed,
+            "changed": log.changed,
+        }, indent=2) + "\n")
+    return log
 
 
 HOLIDAY_BLOCK = """
@@ -346,21 +1501,260 @@ HOLIDAY_BLOCK = """
 """
 
 
+# inotify(7) event masks.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+
+
+class DirectoryWatcher:
+    """
+    Blocks until something changes under the scanned directories.
+
+    Uses inotify through libc, with one watch per directory the scanner visits (movie folders
+    named "Title (Year)" are never opened, so they aren't watched either). Events are only used
+    as a wake-up signal; the incremental scan works out what actually changed. Without inotify,
+    or once the watch limit is hit, it falls back to waking every `poll_interval` seconds.
+    """
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+    def __init__(self, poll_interval: float = 60.0) -> None:
+        self.poll_interval = poll_interval
+        self.fd = -1
+        self._wds: Dict[str, int] = {}
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        except (OSError, AttributeError):
+            self.fd = -1
+
+    @property
+    def polling(self) -> bool:
+        return self.fd < 0
+
+    def sync(self, dirs: Iterable[str]) -> None:
+        """Watch exactly `dirs`: add watches for new directories and drop stale ones."""
+        if self.polling:
+            return
+        wanted = set(dirs)
+        for d in [d for d in self._wds if d not in wanted]:
+            # Fails harmlessly if the kernel already dropped the watch for a deleted directory.
+            self._libc.inotify_rm_watch(self.fd, self._wds.pop(d))
+        for d in sorted(wanted - set(self._wds)):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(d), self.MASK)
+            if wd >= 0:
+                self._wds[d] = wd
+            elif ctypes.get_errno() == errno.ENOSPC:
+                print("inotify watch limit reached (fs.inotify.max_user_watches); falling back to polling")
+                self.close()
+                return
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait up to `timeout` seconds (None = forever) for events; True if any arrived."""
+        if self.polling:
+            if timeout is None:
+                time.sleep(self.poll_interval)
+                return True
+            return False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        while True:
+            try:
+                if not os.read(self.fd, 65536):
+                    break
+            except BlockingIOError:
+                break
+        return True
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+        self.fd = -1
+        self._wds.clear()
+
+
+def run_pass(
+    args: argparse.Namespace,
+    client: TMDBClient,
+    cache: TMDBCache,
+    offline: Optional[OfflineIndex],
+    items: List[MediaItem],
+    known_paths: set,
+) -> bool:
+    """Resolve `items` and regenerate the YAML; returns whether any output changed."""
+    calls_before, retried_before = client.calls, client.retried
+    stats = ResolveStats()
+    collections, cache = build_collections(
+        client, items, cache, workers=args.workers, known_paths=known_paths, stats=stats,
+        prefetch=args.prefetch, offline=offline, fuzzy_threshold=args.fuzzy_threshold,
+    )
+    log = write_yaml(
+        args.out, HOLIDAY_BLOCK, collections, min_items=args.min_items,
+        split_dir=args.split_dir, changelog_path=args.changelog,
+    )
+    kept = sum(1 for v in collections.values() if len(set(v)) >= args.min_items)
+    print(f"Found {kept} collections (after min_items filter); "
+          f"{'wrote' if log.written else 'unchanged, kept'} {args.out}")
+    if log.added or log.removed or log.changed:
+        print(f"Collections: +{len(log.added)} added, -{len(log.removed)} removed, ~{len(log.changed)} changed")
+    print(f"Cache entries: {len(cache)} -> {cache.path}")
+    print(f"Resolution jobs: {stats.jobs} for {stats.items} items "
+          f"({stats.cache_hits} cached, {stats.resolved} resolved)")
+    if stats.collections_fetched or stats.details_avoided:
+        print(f"Collection prefetch: {stats.collections_fetched} collections fetched, "
+              f"{stats.details_avoided} detail calls avoided")
+    fuzzy_total = stats.fuzzy_hits + stats.fuzzy_misses
+    if fuzzy_total:
+        print(f"Fuzzy title index: {stats.fuzzy_hits} hits / {stats.fuzzy_misses} misses "
+              f"({stats.fuzzy_hits / fuzzy_total:.0%} answered locally)")
+    print(f"TMDB requests: {client.calls - calls_before} ({client.retried - retried_before} retried)")
+    return bool(log)
+
+
+def incremental_scan(args: argparse.Namespace) -> Tuple[ScanResult, set]:
+    scan = walk_media_incremental(args.paths, args.manifest)
+    known_paths = {str(item.path) for item in scan.items} - {str(item.path) for item in scan.added}
+    print(f"Incremental scan: {len(scan.items)} items, +{len(scan.added)} / -{len(scan.removed)} "
+          f"({scan.dirs_listed} dirs listed, {scan.dirs_reused} reused)")
+    return scan, known_paths
+
+
+def _watch_pass(
+    args: argparse.Namespace,
+    client: TMDBClient,
+    cache: TMDBCache,
+    offline: Optional[OfflineIndex],
+    watcher: DirectoryWatcher,
+    force: bool,
+) -> bool:
+    """Rescan and rebuild if titles changed (or `force`); returns False if the pass failed."""
+    try:
+        scan, known_paths = incremental_scan(args)
+        watcher.sync(scan.dirs)
+        if force or scan.added or scan.removed:
+            run_pass(args, client, cache, offline, scan.items, known_paths)
+    except (TMDBError, OSError, ValueError, sqlite3.Error) as exc:
+        print(f"Pass failed, will retry: {exc}", file=sys.stderr)
+        return False
+    return True
+
+
+def watch(args: argparse.Namespace, client: TMDBClient, cache: TMDBCache, offline: Optional[OfflineIndex]) -> None:
+    """
+    Rebuild whenever titles are added or removed, after `args.debounce` seconds of quiet.
+
+    A failed pass (TMDB outage, a NAS dropping off) doesn't stop the watcher: the full rebuild is
+    retried on the next event, or after `args.poll_interval` seconds if nothing happens sooner.
+    """
+    watcher = DirectoryWatcher(poll_interval=args.poll_interval)
+    try:
+        pending = not _watch_pass(args, client, cache, offline, watcher, force=True)
+        if watcher.polling:
+            mode = f"polling every {args.poll_interval:g}s"
+        else:
+            mode = f"{len(watcher._wds)} inotify watches"
+        print(f"Watching {', '.join(args.paths)} ({mode}); Ctrl-C to stop")
+        while True:
+            # Polling already wakes every poll_interval; inotify needs a timeout to retry a failed pass.
+            if watcher.wait(args.poll_interval if pending and not watcher.polling else None):
+                # Let bursts (a big copy, a rename of a whole tree) settle before rescanning.
+                while watcher.wait(args.debounce):
+                    pass
+            elif not pending:
+                continue
+            # The manifest already records a failed pass's scan, so only `pending` forces its rebuild.
+            pending = not _watch_pass(args, client, cache, offline, watcher, force=pending)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        watcher.close()
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Build Kometa collection YAML from TMDB data.")
-    parser.add_argument("--tmdb-api-key", dest="tmdb_api_key", default=os.getenv("TMDB_API_KEY"), required=True)
+    parser.add_argument("--tmdb-api-key", dest="tmdb_api_key", default=os.getenv("TMDB_API_KEY"))
     parser.add_argument("--paths", nargs="*", default=SCAN_ROOTS, help="Paths to scan for media")
-    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE)
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE,
+                        help="SQLite resolution cache (an old .json cache is imported into a sibling .sqlite)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only rescan directories changed since the last run (see --manifest)")
+    parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST,
+                        help="Scan manifest used by --incremental")
+    parser.add_argument("--cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS,
+                        help="Days before a resolved title is looked up again")
     parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--split-dir", type=Path,
+                        help="Also write one YAML file per collection into this directory")
+    parser.add_argument("--changelog", type=Path,
+                        help="Write the collections added/removed/changed by this run as JSON")
     parser.add_argument("--min-items", type=int, default=2, help="Minimum titles required to emit a collection")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent TMDB lookups")
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE,
+                        help="Max TMDB requests per second across all workers (0 disables)")
+    parser.add_argument("--no-prefetch", dest="prefetch", action="store_false",
+                        help="Don't fetch /collection parts lists to skip per-movie detail calls")
+    parser.add_argument("--fuzzy-threshold", type=float, default=FUZZY_CACHE_THRESHOLD,
+                        help="Similarity needed to reuse a cached resolution for a near-identical title (0 disables)")
+    parser.add_argument("--tmdb-url", default=TMDB_API, help="TMDB API base URL (e.g. a local stand-in server)")
+    parser.add_argument("--offline", action="store_true",
+                        help="Resolve from the local export index (--offline-db) with no network access")
+    parser.add_argument("--offline-db", type=Path, default=DEFAULT_OFFLINE_DB)
+    parser.add_argument("--ingest-export", type=Path,
+                        help="Load a TMDB movie_ids_*.json.gz export into --offline-db and exit")
+    parser.add_argument("--ingest-membership", type=Path,
+                        help="Load a collection membership file (JSON lines) into --offline-db and exit")
+    parser.add_argument("--export-membership", type=Path,
+                        help="Write the cached collection parts as a membership file and exit")
+    parser.add_argument("--watch", action="store_true",
+                        help="Stay running and rebuild when titles change (implies --incremental)")
+    parser.add_argument("--debounce", type=float, default=10.0,
+                        help="Seconds of filesystem quiet to wait for before rebuilding in --watch")
+    parser.add_argument("--poll-interval", type=float, default=60.0,
+                        help="Rescan interval for --watch when inotify is unavailable")
     args = parser.parse_args()
 
-    items = walk_media(args.paths)
-    collections, cache = build_collections(args.tmdb_api_key, items, args.cache)
-    write_yaml(args.out, HOLIDAY_BLOCK, collections, min_items=args.min_items)
-    kept = sum(1 for v in collections.values() if len(set(v)) >= args.min_items)
-    print(f"Found {kept} collections (after min_items filter); wrote {args.out}")
-    print(f"Cache entries: {len(cache)} -> {args.cache}")
+    if args.ingest_export or args.ingest_membership:
+        index = OfflineIndex(args.offline_db)
+        try:
+            if args.ingest_export:
+                print(f"Ingested {index.ingest_export(args.ingest_export)} movies -> {args.offline_db}")
+            if args.ingest_membership:
+                print(f"Ingested {index.ingest_membership(args.ingest_membership)} memberships -> {args.offline_db}")
+        finally:
+            index.close()
+        return
+    if args.export_membership:
+        cache = TMDBCache(args.cache, ttl_days=args.cache_ttl_days)
+        try:
+            print(f"Wrote {cache.export_membership(args.export_membership)} memberships -> {args.export_membership}")
+        finally:
+            cache.close()
+        return
+    if not args.tmdb_api_key and not args.offline:
+        parser.error("--tmdb-api-key (or TMDB_API_KEY) is required unless --offline is used")
+
+    client = TMDBClient(args.tmdb_api_key or "", base_url=args.tmdb_url, rate=args.rate_limit)
+    cache = TMDBCache(args.cache, ttl_days=args.cache_ttl_days)
+    offline = OfflineIndex(args.offline_db) if args.offline else None
+    try:
+        if args.watch:
+            watch(args, client, cache, offline)
+        elif args.incremental:
+            scan, known_paths = incremental_scan(args)
+            run_pass(args, client, cache, offline, scan.items, known_paths)
+        else:
+            run_pass(args, client, cache, offline, walk_media(args.paths), set())
+    finally:
+        client.close()
+        cache.close()
+        if offline:
+            offline.close()
 
 
 if __name__ == "__main__":